@@ -1,8 +1,49 @@
+import functools
+import io
+import multiprocessing
+import os
+import pathlib
+import tempfile
 import numpy as np
 import streamlit as st
-import random
 import pandas as pd
-from copy import deepcopy
+from lib.core import count_safe_sequences as count_sequences, initconfig, initstate
+from lib.cache import LRUCache, state_key
+from lib.ingest import ValidationError, read_requests, read_state
+from lib.metrics import Metrics
+from lib.scenario import load_scenario, save_scenario
+from lib.simulator import Simulator
+from lib.sequences import (ParallelSequenceEnumerator, SafeSequenceEnumerator, best_safe_sequence,
+                           score_sequences, top_sequences)
+
+# 安全序列枚举上限：最多展示的序列数与搜索耗时（秒）
+SEQ_LIMIT = 200
+SEQ_TIME_BUDGET = 0.5
+# 进程数超过该值时安全序列个数改用抽样估计
+COUNT_EXACT_MAX_N = 20
+# 最优安全序列搜索：精确求解的最大进程数与耗时（秒）
+BEST_EXACT_MAX_N = 15
+BEST_TIME_BUDGET = 0.5
+# 每个会话缓存的安全序列分析结果数
+ANALYSIS_CACHE_SIZE = 32
+# 多进程完整枚举：最大进程数、序列数与耗时（秒），以及逐块评分的行数
+FULL_ENUM_MAX_N = 12
+FULL_ENUM_MAX_COUNT = 1_000_000
+FULL_ENUM_TIME_BUDGET = 30.0
+FULL_ENUM_SCORE_ROWS = 65536
+# 随机配置的规模上限，超过小规模上限即为大规模系统
+SMALL_MAX_N, SMALL_MAX_M = 10, 5
+LARGE_MAX_N, LARGE_MAX_M = 100000, 256
+# 大规模系统：安全序列只显示前若干项，请求序列按块（进程数）惰性生成
+PREVIEW_ROWS = 200
+LARGE_CHUNK_SIZE = 1024
+# 表格分页的每页行数；Styler序列化的耗时随单元格数、列数增长，超过上限的页不着色
+PAGE_ROWS = 50
+STYLE_MAX_CELLS, STYLE_MAX_COLS = 2000, 64
+# 热力图的颜色级数及各级样式
+HEAT_LEVELS = 10
+HEAT_STYLES = np.array([f"background-color: rgba(255, 99, 71, {k / HEAT_LEVELS:.1f})"
+                        for k in range(HEAT_LEVELS + 1)])
 
 # 页面配置
 st.set_page_config(page_title="Banker's Algorithm Simulator", layout="wide")
@@ -41,10 +82,131 @@ def main():
             #     st.session_state.page = "view"
             # if st.button("▶️ 模拟",use_container_width=True):
             #     st.session_state.page = "simulator"
-
+        st.toggle("📈 性能指标", key="show_metrics")
 
     pages[st.session_state.page]()
 
+    # 页面渲染完成后再显示指标，包含本次渲染的耗时
+    if st.session_state.get("show_metrics"):
+        with st.sidebar:
+            show_metrics_panel()
+
+
+def metrics() -> Metrics:
+    """当前会话的性能指标"""
+    if "metrics" not in st.session_state:
+        st.session_state.metrics = Metrics()
+    return st.session_state.metrics
+
+
+def timed(stage):
+    """把函数的每次调用计入当前会话指标的stage阶段"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics().timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def show_metrics_panel():
+    """侧栏指标面板：各阶段耗时、计数器及Prometheus文本导出"""
+    snapshot = metrics().snapshot()
+    st.header("📈 性能指标")
+    if snapshot["timers"]:
+        timers = pd.DataFrame(snapshot["timers"]).T[["count", "last_ms", "mean_ms", "max_ms", "total_ms"]]
+        st.dataframe(timers.style.format("{:.2f}", subset=["last_ms", "mean_ms", "max_ms", "total_ms"]))
+    if snapshot["counters"]:
+        st.dataframe(pd.Series(snapshot["counters"], name="值"))
+    cols = st.columns(2)
+    cols[0].download_button("导出", metrics().to_prometheus(), file_name="metrics.prom",
+                            mime="text/plain", use_container_width=True)
+    if cols[1].button("清零", use_container_width=True):
+        metrics().reset()
+        st.rerun()
+
+def save_state(state):
+    """把lib.core.initstate生成的系统状态交给模拟器，session中的矩阵与请求序列直接引用模拟器的数组"""
+    sim = Simulator.from_state(state, method="auto")
+    st.session_state.sim = sim
+    st.session_state.n, st.session_state.m = sim.n, sim.m
+    st.session_state.sys_resource = sim.sys_resource
+    st.session_state.max_alloc = sim.max_alloc
+    st.session_state.alloc = sim.alloc
+    st.session_state.need = sim.need
+    st.session_state.available = sim.available
+    st.session_state.tick = sim.tick
+
+
+def is_large() -> bool:
+    """超出小规模上限的系统：安全序列只给出安全性检查得到的一个"""
+    return st.session_state.n > SMALL_MAX_N or st.session_state.m > SMALL_MAX_M
+
+
+def page_window(total: int, key: str) -> slice:
+    """表格分页：超过PAGE_ROWS行时显示页码选择，返回当前页的行范围"""
+    pages = max((total - 1) // PAGE_ROWS + 1, 1)
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"页码（共{pages}页，{total}行）", 1, pages, 1, key=key)
+    start = (page - 1) * PAGE_ROWS
+    return slice(start, min(start + PAGE_ROWS, total))
+
+
+def highlight_styles(window, lo, hi) -> np.ndarray:
+    """最小值标蓝、最大值标粉，一次生成整页的样式"""
+    return np.where(window == lo, 'color: blue', np.where(window == hi, 'color: pink', ''))
+
+
+def heatmap_styles(window, lo, hi) -> np.ndarray:
+    """按[lo, hi]归一化后量化为HEAT_LEVELS级背景色，一次生成整页的样式"""
+    level = (window - lo) * HEAT_LEVELS // np.maximum(hi - lo, 1)
+    return HEAT_STYLES[np.clip(level, 0, HEAT_LEVELS)]
+
+
+@timed("render")
+def show_matrix(matrix, key=None, col_prefix="R", row_prefix="P", index=None, style=None):
+    """分页显示矩阵或向量，只为当前页生成样式
+
+    style为"highlight"时最小值标蓝、最大值标粉，为"heatmap"时按数值着色；
+    最值在整个矩阵上按列计算一次（向量按整行），与翻到哪一页无关；
+    当前页超过STYLE_MAX_CELLS个单元格或STYLE_MAX_COLS列时不着色。
+    """
+    matrix = np.atleast_2d(matrix)
+    rows = page_window(len(matrix), key)
+    window = matrix[rows]
+    df = pd.DataFrame(
+        window,
+        columns=[f"{col_prefix}{i}" for i in range(matrix.shape[1])],
+        index=index if index is not None else [f"{row_prefix}{i}" for i in range(rows.start, rows.stop)]
+    )
+    if style and 0 < window.size <= STYLE_MAX_CELLS and window.shape[1] <= STYLE_MAX_COLS:
+        axis = None if len(matrix) == 1 else 0
+        lo, hi = matrix.min(axis=axis), matrix.max(axis=axis)
+        css = (highlight_styles if style == "highlight" else heatmap_styles)(window, lo, hi)
+        df = df.style.apply(lambda _: css, axis=None)
+    st.dataframe(df)
+
+
+@timed("render")
+def show_reqs(key, striped=True, height=250, current=None):
+    """分页显示模拟器中的请求序列，偶数行加底色，current为当前tick时标出该行"""
+    sim = st.session_state.sim
+    trace = sim.trace
+    rows = page_window(len(trace), key)
+    req_df = reqs_frame(trace[rows], rows.start)
+    if striped and len(req_df):
+        ticks = np.arange(rows.start, rows.stop)[:, None]
+        css = np.where(ticks % 2 == 0, 'background: lightblue', '')
+        css = np.where(ticks == current, 'background: gold', css)
+        css = np.broadcast_to(css, req_df.shape)
+        req_df = req_df.style.apply(lambda _: css, axis=None)
+    st.dataframe(req_df, height=height)
+    if sim.pending:
+        st.caption(f"已生成{len(trace)}个请求，其余按需生成")
+
+
 # 欢迎页面
 def page_welcome():
     # 重置session
@@ -54,7 +216,6 @@ def page_welcome():
     st.session_state.max_alloc = 0
     st.session_state.alloc = 0
     st.session_state.need = 0
-    st.session_state.reqs = 0
     st.session_state.current_step = 0
     st.session_state.available = 0
     st.session_state.tick = 0
@@ -75,6 +236,17 @@ def page_welcome():
         st.session_state.page = "example"
         st.rerun()
 
+    uploaded = st.file_uploader("导入场景文件", type=["bks"])
+    if uploaded is not None and st.button("📂 导入场景", use_container_width=True):
+        try:
+            state = load_scenario(uploaded.getvalue())
+        except ValueError as e:
+            st.error(f"无法导入场景：{e}")
+        else:
+            save_state(state)
+            st.session_state.page = "view"
+            st.rerun()
+
     intros = st.columns(2)
 
     intros[1].markdown("""
@@ -233,16 +405,18 @@ def page_config():
         st.session_state.max_alloc = 0
         st.session_state.alloc = 0
         st.session_state.need = 0
-        st.session_state.reqs = 0
         st.session_state.current_step = 0
         st.session_state.available = 0
         st.session_state.tick = 0
         st.session_state.safe_seq = 0
         #
+        large = st.toggle("大规模系统", key="large_mode",
+                          help=f"进程数最多{LARGE_MAX_N}、资源种类最多{LARGE_MAX_M}，只给出一个安全序列")
+        max_n, max_m = (LARGE_MAX_N, LARGE_MAX_M) if large else (SMALL_MAX_N, SMALL_MAX_M)
         with st.form("basic_params"):
             cols = st.columns(3)
-            n = cols[0].number_input("进程数 (n)", 1, 10, 3)
-            m = cols[1].number_input("资源种类数 (m)", 1, 5, 2)
+            n = cols[0].number_input("进程数 (n)", 1, max_n, 3)
+            m = cols[1].number_input("资源种类数 (m)", 1, max_m, 2)
             lowest = cols[2].number_input("最低资源数", 1, 5, 5)
 
             if st.form_submit_button("确认",use_container_width=True):
@@ -255,66 +429,13 @@ def page_config():
     # 步骤2：生成系统资源
     if st.session_state.current_step == 1:
         max_resource = 20
-        sys_resource = [max(random.randint(0, max_resource) ,st.session_state.lowest)
-                        for _ in range(st.session_state.m)]
-
-        # 生成已分配矩阵，加和小于系统资源
-        alloc = []
-        sys_resource_cp = deepcopy(sys_resource)
-        for _ in range(st.session_state.n):
-            row = [random.randint(0, res) for res in sys_resource_cp]
-            sys_resource_cp = [res - r for res, r in zip(sys_resource_cp, row)] # 减去已分配的资源
-            alloc.append(row) # 加入已分配矩阵
-
-
-        # 生成最大分配矩阵
-        max_alloc = []
-        for i in range(st.session_state.n):
-            row = [random.randint(alloc[i][j] , sys_resource[j]) for j in range(st.session_state.m)]# 最大分配矩阵大于等于已分配矩阵
-            max_alloc.append(row)
-
-        # 计算需求矩阵
-        need = []
-        for i in range(st.session_state.n):
-            row = [max_alloc[i][j] - alloc[i][j] for j in range(st.session_state.m)]
-            need.append(row)
-
-        # 生成请求列表
-        reqs = []
-        need_copy = deepcopy(need)
-        '''
-        生成请求列表，每个进程随机请求1到need[i][j]的资源，
-        直到need[i][j]为0，然后随机生成下一个进程的请求，
-        直到所有进程的请求都生成完毕，然后随机生成5个padding请求
-        '''
-        for i in range(st.session_state.n):
-            while sum(need_copy[i]) > 0:
-                req = []
-                for j in range(st.session_state.m):
-                    if need_copy[i][j] == 0:
-                        req.append(0)
-                    else:
-                        req.append(random.randint(1, need_copy[i][j]))
-                reqs.append((i, req))
-                for j in range(st.session_state.m):
-                    need_copy[i][j] -= req[j]
-        random.shuffle(reqs) # 随机打乱请求列表
-        # reqs += [(-1, [0] * st.session_state.m)] * 5  # 添加padding
-        # 完毕
-
-        # 计算初始可用资源
-        alloc_sum = [sum(col) for col in zip(*alloc)]
-        available = [sys_resource[i] - alloc_sum[i] for i in range(st.session_state.m)]
+        state = initstate(*initconfig(st.session_state.n, st.session_state.m,
+                                      st.session_state.lowest, max_resource),
+                          chunk_size=LARGE_CHUNK_SIZE if is_large() else None)
 
         # 保存到session
-        st.session_state.sys_resource = sys_resource
-        st.session_state.max_alloc = max_alloc
-        st.session_state.alloc = alloc
-        st.session_state.need = need
-        st.session_state.reqs = reqs
-        st.session_state.tick = 0
+        save_state(state)
         st.session_state.current_step = 2
-        st.session_state.available = available
         st.rerun()
 
     # 步骤3：显示配置结果
@@ -328,25 +449,11 @@ def page_config():
         resources = st.columns(2)
         with resources[0]:
             st.markdown("**系统总资源**")
-            sys_df = pd.DataFrame(
-                [st.session_state.sys_resource],
-                columns=[f"资源{i}" for i in range(st.session_state.m)],
-                index=["总量"]
-            )
-            st.dataframe(sys_df.style.map(
-                lambda x: 'color: blue' if x == min(st.session_state.sys_resource) else 'color: pink' if x == max(
-                    st.session_state.sys_resource) else ''))
+            show_matrix(st.session_state.sys_resource, col_prefix="资源", index=["总量"], style="highlight")
 
         with resources[1]:
             st.markdown("**可用资源**")
-            avail_df = pd.DataFrame(
-                [st.session_state.available],
-                columns=[f"资源{i}" for i in range(st.session_state.m)],
-                index=["可用量"]
-            )
-            st.dataframe(avail_df.style.map(
-                lambda x: 'color: blue' if x == min(st.session_state.available) else 'color: pink' if x == max(
-                    st.session_state.available) else ''))
+            show_matrix(st.session_state.available, col_prefix="资源", index=["可用量"], style="highlight")
 
         # 矩阵显示
         st.subheader("资源分配矩阵")
@@ -354,48 +461,21 @@ def page_config():
 
         with cols[0]:
             st.markdown("**最大分配矩阵 (MAX)**")
-            max_df = pd.DataFrame(
-                st.session_state.max_alloc,
-                columns=[f"资源{i}" for i in range(st.session_state.m)],
-                index=[f"进程{i}" for i in range(st.session_state.n)]
-            )
-            st.dataframe(max_df.style.map(lambda x: 'color: blue' if x == min(
-                map(min, st.session_state.max_alloc)) else 'color: pink' if x == max(
-                map(max, st.session_state.max_alloc)) else ''))
+            show_matrix(st.session_state.max_alloc, "config_max", "资源", "进程", style="highlight")
 
         with cols[1]:
             st.markdown("**已分配矩阵 (ALLOC)**")
-            alloc_df = pd.DataFrame(
-                st.session_state.alloc,
-                columns=[f"资源{i}" for i in range(st.session_state.m)],
-                index=[f"进程{i}" for i in range(st.session_state.n)]
-            )
-            st.dataframe(alloc_df.style.map(
-                lambda x: 'color: blue' if x == min(map(min, st.session_state.alloc)) else 'color: pink' if x == max(
-                    map(max, st.session_state.alloc)) else ''))
+            show_matrix(st.session_state.alloc, "config_alloc", "资源", "进程", style="highlight")
 
         with cols[2]:
             st.markdown("**需求矩阵 (NEED)**")
-            need_df = pd.DataFrame(
-                st.session_state.need,
-                columns=[f"资源{i}" for i in range(st.session_state.m)],
-                index=[f"进程{i}" for i in range(st.session_state.n)]
-            )
-            st.dataframe(need_df.style.map(
-                lambda x: 'color: blue' if x == min(map(min, st.session_state.need)) else 'color: pink' if x == max(
-                    map(max, st.session_state.need)) else ''))
+            show_matrix(st.session_state.need, "config_need", "资源", "进程", style="highlight")
 
 
 
         # 显示请求序列
         st.subheader("生成的请求序列")
-        req_df = pd.DataFrame(
-            [(i, req[0], req[1]) for i, req in enumerate(st.session_state.reqs)],
-            columns=["Tick", "进程ID", "请求资源"]
-        )
-        st.dataframe(
-            req_df.style.apply(lambda x: ['background: lightblue' if x.name % 2 == 0 else '' for i in x], axis=1),
-            height=250)
+        show_reqs("config_reqs")
 
         # 操作按钮
         c1, c2 = st.columns(2)
@@ -458,49 +538,10 @@ def page_sample_init():
 
     # 初始化按钮
     if st.button("🚀 使用样例初始化系统", use_container_width=True):
-        # 计算Need矩阵
-        need = []
-        for i in range(len(sample_data["Allocation"])):
-            row = [
-                sample_data["Max"][i][j] - sample_data["Allocation"][i][j]
-                for j in range(len(sample_data["Available"]))
-            ]
-            need.append(row)
-
-        # 生成请求序列
-        reqs = []
-        need_copy = deepcopy(need)
-        for i in range(len(need_copy)):
-            while sum(need_copy[i]) > 0:
-                req = []
-                for j in range(len(need_copy[i])):
-                    if need_copy[i][j] == 0:
-                        req.append(0)
-                    else:
-                        req.append(random.randint(1, need_copy[i][j]))
-                reqs.append((i, req))
-                for j in range(len(need_copy[i])):
-                    need_copy[i][j] -= req[j]
-
-        random.shuffle(reqs)
-        # reqs += [(-1, [0] * len(sample_data["Available"]))] * 5
-
-        # 保存到session_state
-        st.session_state.n = len(sample_data["Allocation"])
-        st.session_state.m = len(sample_data["Available"])
-        st.session_state.sys_resource = [
-            sum(col) for col in zip(*sample_data["Allocation"])
-        ]
-        st.session_state.sys_resource = [
-            st.session_state.sys_resource[i] + sample_data["Available"][i]
-            for i in range(len(sample_data["Available"]))
-        ]
-        st.session_state.max_alloc = sample_data["Max"]
-        st.session_state.alloc = sample_data["Allocation"]
-        st.session_state.need = need
-        st.session_state.reqs = reqs
-        st.session_state.tick = 0
-        st.session_state.available = sample_data["Available"]
+        # 系统总资源 = 已分配之和 + 可用资源
+        alloc = np.array(sample_data["Allocation"])
+        sys_resource = alloc.sum(axis=0) + np.array(sample_data["Available"])
+        save_state(initstate(sys_resource, sample_data["Max"], alloc))
 
         st.success("系统初始化完成！")
         st.session_state.page = "view"
@@ -543,6 +584,20 @@ def page_input():
                 except ValueError:
                     st.error("请输入有效的数字（用英文逗号分隔）")
 
+        # 从调度器导出的快照文件导入
+        with st.form("file_input"):
+            st.subheader("或从文件导入")
+            st.caption("状态文件每行一个进程：CSV为max_0..max_{m-1}, alloc_0..alloc_{m-1}，"
+                       "JSONL为{\"max\": [...], \"alloc\": [...]}；"
+                       "请求文件每行一个请求：CSV为pid, req_0..req_{m-1}，JSONL为{\"pid\": p, \"request\": [...]}")
+            cols = st.columns(3)
+            state_file = cols[0].file_uploader("状态文件", type=["csv", "jsonl"])
+            reqs_file = cols[1].file_uploader("请求文件（可选，缺省时随机生成）", type=["csv", "jsonl"])
+            sys_text = cols[2].text_input("系统总资源（逗号分隔，CSV必填）", "")
+
+            if st.form_submit_button("导入 ▶️"):
+                import_files(state_file, reqs_file, sys_text)
+
     # 步骤2：输入分配矩阵
     elif st.session_state.current_step == 1:
         st.subheader("步骤2/3 - 输入分配矩阵")
@@ -591,8 +646,7 @@ def page_input():
                         valid = False
 
                 if valid:
-                    st.session_state.max_alloc = max_data
-                    st.session_state.alloc = alloc_data
+                    save_state(initstate(st.session_state.sys_resource, max_data, alloc_data))
                     st.session_state.current_step = 2
                     st.rerun()
 
@@ -600,68 +654,18 @@ def page_input():
     elif st.session_state.current_step == 2:
         st.subheader("步骤3/3 - 确认配置")
 
-
-
-        # 计算需求矩阵
-        need = []
-        for i in range(st.session_state.n):
-            row = [
-                st.session_state.max_alloc[i][j] - st.session_state.alloc[i][j]
-                for j in range(st.session_state.m)
-            ]
-            need.append(row)
-
-        # 生成请求序列
-        reqs = []
-        need_copy = deepcopy(need)
-        for i in range(st.session_state.n):
-            while sum(need_copy[i]) > 0:
-                req = []
-                for j in range(st.session_state.m):
-                    if need_copy[i][j] == 0:
-                        req.append(0)
-                    else:
-                        req.append(random.randint(1, need_copy[i][j]))
-                reqs.append((i, req))
-                for j in range(st.session_state.m):
-                    need_copy[i][j] -= req[j]
-
-        random.shuffle(reqs)
-        # reqs += [(-1, [0] * st.session_state.m)] * 5
-
-        # 计算初始可用资源
-        alloc_sum = [sum(col) for col in zip(*st.session_state.alloc)]
-        available = [st.session_state.sys_resource[i] - alloc_sum[i] for i in range(st.session_state.m)]
-        st.session_state.available=available
-        # 保存数据
-        st.session_state.need = need
-        st.session_state.reqs = reqs
-        st.session_state.tick = 0
-
         # 显示配置摘要
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("**最大分配矩阵**")
-            st.dataframe(pd.DataFrame(
-                st.session_state.max_alloc,
-                columns=[f"R{i}" for i in range(st.session_state.m)],
-                index=[f"P{i}" for i in range(st.session_state.n)]
-            ))
+            show_matrix(st.session_state.max_alloc, "input_max")
 
         with col2:
             st.markdown("**已分配矩阵**")
-            st.dataframe(pd.DataFrame(
-                st.session_state.alloc,
-                columns=[f"R{i}" for i in range(st.session_state.m)],
-                index=[f"P{i}" for i in range(st.session_state.n)]
-            ))
+            show_matrix(st.session_state.alloc, "input_alloc")
 
         st.markdown("**生成的请求序列**")
-        req_df = pd.DataFrame(
-            [(i, req[0], req[1]) for i, req in enumerate(st.session_state.reqs)],
-            columns=["Tick", "进程ID", "请求资源"]
-        )
-        st.dataframe(req_df, height=300)
+        show_reqs("input_reqs", striped=False, height=300)
 
         # 操作按钮
         c1, c2, c3 = st.columns(3)
@@ -671,9 +675,39 @@ def page_input():
         if c2.button("🔄 重新输入", use_container_width=True):
             st.session_state.current_step = 0
             st.rerun()
-        if c3.button("✏️ 修改矩阵", use_container_width=True):
+        # 大规模系统无法逐格编辑
+        if not is_large() and c3.button("✏️ 修改矩阵", use_container_width=True):
             st.session_state.current_step = 1
             st.rerun()
+
+
+def import_files(state_file, reqs_file, sys_text):
+    """解析上传的状态与请求文件，全部违规项一次性显示，成功后进入确认步骤"""
+    if state_file is None:
+        st.error("请上传状态文件")
+        return
+    try:
+        sys_resource = [int(x) for x in sys_text.split(",")] if sys_text.strip() else None
+    except ValueError:
+        st.error("请输入有效的数字（用英文逗号分隔）")
+        return
+    try:
+        sys_resource, max_alloc, alloc = read_state(state_file, sys_resource)
+        n, m = alloc.shape
+        large = n > SMALL_MAX_N or m > SMALL_MAX_M
+        state = initstate(sys_resource, max_alloc, alloc,
+                          chunk_size=LARGE_CHUNK_SIZE if large and reqs_file is None else None)
+        if reqs_file is not None:
+            state["pids"], state["reqs"] = read_requests(reqs_file, n, m)
+    except ValidationError as e:
+        for violation in e.violations:
+            st.error(violation)
+        return
+    save_state(state)
+    st.session_state.current_step = 2
+    st.rerun()
+
+
 # 审查页面
 def page_view():
     st.title("系统状态审查")
@@ -693,25 +727,11 @@ def page_view():
     resources = st.columns(2)
     with resources[0]:
         st.markdown("**系统总资源**")
-        sys_df = pd.DataFrame(
-            [st.session_state.sys_resource],
-            columns=[f"资源{i}" for i in range(st.session_state.m)],
-            index=["总量"]
-        )
-        st.dataframe(sys_df.style.map(
-            lambda x: 'color: blue' if x == min(st.session_state.sys_resource) else 'color: pink' if x == max(
-                st.session_state.sys_resource) else ''))
+        show_matrix(st.session_state.sys_resource, col_prefix="资源", index=["总量"], style="highlight")
 
     with resources[1]:
         st.markdown("**可用资源**")
-        avail_df = pd.DataFrame(
-            [st.session_state.available],
-            columns=[f"资源{i}" for i in range(st.session_state.m)],
-            index=["可用量"]
-        )
-        st.dataframe(avail_df.style.map(
-            lambda x: 'color: blue' if x == min(st.session_state.available) else 'color: pink' if x == max(
-                st.session_state.available) else ''))
+        show_matrix(st.session_state.available, col_prefix="资源", index=["可用量"], style="highlight")
 #%%
     # 显示矩阵
     st.subheader("资源分配矩阵")
@@ -719,79 +739,68 @@ def page_view():
 
     with col1:
         st.write("最大分配矩阵")
-        st.dataframe(pd.DataFrame(
-            st.session_state.max_alloc,
-            columns=[f"R{i}" for i in range(st.session_state.m)],
-            index=[f"P{i}" for i in range(st.session_state.n)]
-        ))
+        show_matrix(st.session_state.max_alloc, "view_max", style="heatmap")
 
     with col2:
         st.write("已分配矩阵")
-        st.dataframe(pd.DataFrame(
-            st.session_state.alloc,
-            columns=[f"R{i}" for i in range(st.session_state.m)],
-            index=[f"P{i}" for i in range(st.session_state.n)]
-        ))
+        show_matrix(st.session_state.alloc, "view_alloc", style="heatmap")
 
     with col3:
         st.write("需求矩阵")
-        st.dataframe(pd.DataFrame(
-            st.session_state.need,
-            columns=[f"R{i}" for i in range(st.session_state.m)],
-            index=[f"P{i}" for i in range(st.session_state.n)]
-        ))
+        show_matrix(st.session_state.need, "view_need", style="heatmap")
     # 显示请求序列
     st.subheader("生成的请求序列")
-    req_df = pd.DataFrame(
-        [(i, req[0], req[1]) for i, req in enumerate(st.session_state.reqs)],
-        columns=["Tick", "进程ID", "请求资源"]
-    )
-    st.dataframe(
-        req_df.style.apply(lambda x: ['background: lightblue' if x.name % 2 == 0 else '' for i in x], axis=1),
-        height=250)
+    show_reqs("view_reqs")
 
     # 操作按钮
-    c1, c2 = st.columns(2)
+    c1, c2, c3 = st.columns(3)
     if c1.button("▶️ 开始模拟",use_container_width=True):
         st.session_state.page = "simulator"
         st.rerun()
     if c2.button("↩️ 返回配置",use_container_width=True):
         st.session_state.page = "config"
         st.rerun()
+    # 场景文件在脚本线程中生成，下载线程只读取生成好的字节，不会与模拟器的修改并发
+    sim = st.session_state.sim
+    exported = st.session_state.get("exported")
+    if exported is not None and (exported[0] is not sim or exported[1] != sim.tick):
+        exported = st.session_state.exported = None
+    if exported is not None:
+        c3.download_button("⬇️ 下载场景文件", exported[2], file_name="scenario.bks",
+                           mime="application/octet-stream", use_container_width=True)
+    elif c3.button("💾 导出场景", use_container_width=True):
+        st.session_state.exported = (sim, sim.tick, export_scenario(sim))
+        st.rerun()
 
-def calculate_efficiency(system, sequence):
-    """加权资源利用率计算"""
-    total_weight = sum(system["resources"])
-    usage = 0.0
 
-    # 模拟执行过程计算资源利用率
-    work = system["available"].copy()
-    alloc_copy = deepcopy(system["allocation"])
+@timed("export")
+def export_scenario(sim) -> bytes:
+    """把模拟器的当前状态及尚未处理的请求序列导出为场景文件
 
-    for client in sequence:
-        # 分配资源
-        for ri in range(len(work)):
-            work[ri] += alloc_copy[client][ri]
+    尚未生成的请求块由快照重新生成，模拟器中的请求序列不会因导出而增长。
+    """
+    buffer = io.BytesIO()
+    save_scenario(buffer, sim.sys_resource, sim.alloc + sim.need, sim.alloc,
+                  ((block["pid"], block["request"]) for block in sim.snapshot_blocks(sim.tick)))
+    return buffer.getvalue()
 
-        # 计算当前利用率
-        for ri in range(len(work)):
-            used = system["resources"][ri] - work[ri]
-            weight = system["resources"][ri] / total_weight
-            usage += (used / system["resources"][ri]) * weight
+def reqs_frame(trace, start=0):
+    """请求序列表格，trace为lib.core.reqdtype结构化数组，start为首行的tick"""
+    return pd.DataFrame({
+        "Tick": np.arange(start, start + len(trace)),
+        "进程ID": trace["pid"],
+        "请求资源": list(trace["request"]),
+    })
 
-    # 平均利用率
-    return usage / len(sequence)
 
-def display_safe_sequences(safe_sequences, system):
+def display_safe_sequences(safe_sequences, efficiencies):
     """展示安全序列及其评分"""
     if not safe_sequences:
         st.error("未找到安全序列！")
         return
 
-    # 计算每个安全序列的评分
     results = []
-    for seq in safe_sequences:
-        efficiency = calculate_efficiency(system, seq)
+    for seq, efficiency in zip(safe_sequences, efficiencies):
         results.append({
             "安全序列": " -> ".join([f"P{p}" for p in seq]),
             "资源利用率": f"{efficiency:.2%}"
@@ -800,7 +809,143 @@ def display_safe_sequences(safe_sequences, system):
     # 转换为DataFrame
     df = pd.DataFrame(results)
     st.dataframe(df, use_container_width=True,)
+
+
+def analyze_safe_sequences():
+    """安全序列分析：枚举、计数并评分，结果按系统状态缓存在会话中"""
+    if is_large():
+        return analyze_large()
+    if "analysis_cache" not in st.session_state:
+        st.session_state.analysis_cache = LRUCache(ANALYSIS_CACHE_SIZE)
+    cache = st.session_state.analysis_cache
+    key = state_key(st.session_state.sys_resource, st.session_state.alloc,
+                    st.session_state.need, st.session_state.available,
+                    max_count=SEQ_LIMIT, time_budget=SEQ_TIME_BUDGET)
+    result = cache.get(key)
+    stats = metrics()
+    if result is not None:
+        stats.inc("analysis_cache_hits")
+        return result
+    stats.inc("analysis_cache_misses")
+
+    with stats.timer("enumerate"):
+        safe_sequences, enumerator = bankers_algorithm()
+    stats.inc("dfs_nodes", enumerator.nodes)
+    stats.inc("sequences_found", enumerator.found)
+    with stats.timer("count"):
+        total, exact = count_safe_sequences() if safe_sequences else (0, True)
+
+    # 批量评分，按资源利用率从高到低排列
+    with stats.timer("score"):
+        scores = score_sequences(safe_sequences, st.session_state.alloc,
+                                 st.session_state.available, st.session_state.sys_resource)
+        best = top_sequences(scores)
+    with stats.timer("optimum"):
+        optimum = best_safe_sequence(st.session_state.alloc, st.session_state.need,
+                                     st.session_state.available, st.session_state.sys_resource,
+                                     exact_max_n=BEST_EXACT_MAX_N, time_budget=BEST_TIME_BUDGET)
+    result = {
+        "sequences": [safe_sequences[i] for i in best],
+        "truncated": enumerator.truncated,
+        "multiplicity": enumerator.multiplicity,
+        "total": total,
+        "exact": exact,
+        "efficiencies": scores[best].tolist(),
+        "optimum": optimum,
+    }
+    cache.put(key, result)
+    return result
+
+
+def show_full_enumeration():
+    """多进程枚举当前状态的安全序列，结果按系统状态保存在会话中"""
+    key = state_key(st.session_state.alloc, st.session_state.need, st.session_state.available)
+    result = st.session_state.get("full_enum")
+    if result is not None and result["key"] != key:
+        discard_full_enumeration()
+        result = None
+    if st.button("开始完整枚举", use_container_width=True):
+        discard_full_enumeration()
+        result = st.session_state.full_enum = run_full_enumeration(key)
+    if result is None:
+        st.caption(f"按前两个进程拆分搜索树，在多个进程中并行枚举，"
+                   f"最多{FULL_ENUM_MAX_COUNT}个序列、{FULL_ENUM_TIME_BUDGET:.0f}秒")
+        return
+
+    found = result["found"]
+    multiplicity = SafeSequenceEnumerator(st.session_state.alloc, st.session_state.need,
+                                          calculate_available()).multiplicity
+    total = f"，计入可互换进程共{found * multiplicity}个" if multiplicity > 1 else ""
+    limit = "（已达数量或时间上限，结果不完整）" if result["truncated"] else ""
+    st.success(f"共{found}个安全序列{total}{limit}，按资源利用率展示前{len(result['scores'])}个")
+    display_safe_sequences(result["sequences"].tolist(), result["scores"].tolist())
+    path = result["csv"]
+    st.download_button("导出全部（CSV）", lambda: pathlib.Path(path).read_bytes(),
+                       file_name="safe_sequences.csv", mime="text/csv", use_container_width=True)
+
+
+@timed("parallel_enumerate")
+def run_full_enumeration(key) -> dict:
+    """逐块评分并保留资源利用率最高的SEQ_LIMIT个序列，全部序列及评分流式写入临时CSV文件
+
+    Streamlit服务进程是多线程的，工作进程以spawn方式启动而不是fork。
+    """
+    n = st.session_state.n
+    enumerator = ParallelSequenceEnumerator(
+        st.session_state.alloc, st.session_state.need, calculate_available(),
+        max_count=FULL_ENUM_MAX_COUNT, time_budget=FULL_ENUM_TIME_BUDGET,
+        mp_context=multiprocessing.get_context("spawn"))
+    best = np.zeros((0, n), dtype=np.int16)
+    best_scores = np.zeros(0)
+    progress = st.empty()
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+        f.write(",".join([f"step{k}" for k in range(n)] + ["score"]) + "\n")
+        for block in enumerator:
+            for start in range(0, len(block), FULL_ENUM_SCORE_ROWS):
+                part = block[start:start + FULL_ENUM_SCORE_ROWS]
+                scores = score_sequences(part, st.session_state.alloc,
+                                         st.session_state.available, st.session_state.sys_resource)
+                np.savetxt(f, np.column_stack([part, scores]), fmt=["%d"] * n + ["%.6f"], delimiter=",")
+                merged, merged_scores = np.concatenate([best, part]), np.concatenate([best_scores, scores])
+                keep = top_sequences(merged_scores, SEQ_LIMIT)
+                best, best_scores = merged[keep], merged_scores[keep]
+            progress.caption(f"已枚举{enumerator.found}个安全序列……")
+    progress.empty()
+    metrics().inc("sequences_found", enumerator.found)
+    return {"key": key, "found": enumerator.found, "truncated": enumerator.truncated,
+            "sequences": best, "scores": best_scores, "csv": f.name}
+
+
+def discard_full_enumeration():
+    """删除上一次完整枚举的结果及其CSV文件"""
+    result = st.session_state.pop("full_enum", None)
+    if result is not None and os.path.exists(result["csv"]):
+        os.remove(result["csv"])
+
+
+def analyze_large():
+    """大规模系统只做一次安全性检查，给出其中的一个安全序列及评分，不做枚举与计数
+
+    检查结果缓存在模拟器上，状态改变前的重新运行（翻页、切换开关）以及之后的分配都直接复用。
+    """
+    with metrics().timer("safety_check"):
+        safe, seq = st.session_state.sim.safety()
+    sequences = [seq] if safe else []
+    scores = score_sequences(sequences, st.session_state.alloc,
+                             st.session_state.available, st.session_state.sys_resource)
+    return {
+        "sequences": sequences,
+        "truncated": True,
+        "multiplicity": 1,
+        "total": None,
+        "exact": False,
+        "efficiencies": scores.tolist(),
+        "optimum": ([], 0.0, False),
+    }
+
+
 # 模拟页面
+@timed("page_simulator")
 def page_simulator():
     st.title("算法模拟")
     # 显示基本信息
@@ -809,6 +954,13 @@ def page_simulator():
     cols[1].metric("资源种类数", st.session_state.m)
     cols[2].metric("当前Tick", st.session_state.tick)
 
+    # 快进结果摘要
+    if "ff_summary" in st.session_state:
+        summary = st.session_state.pop("ff_summary")
+        st.info(f"快进{summary['ticks']}个tick：分配{summary['granted']}个，"
+                f"超过需求{summary['denied_need']}个，资源不足{summary['denied_available']}个，"
+                f"不安全跳过{summary['skipped']}个；当前状态{'安全' if summary['safe'] else '不安全'}")
+
     # %%
     # 显示资源分配
     st.subheader("系统资源分配")
@@ -817,25 +969,11 @@ def page_simulator():
     resources = st.columns(2)
     with resources[0]:
         st.markdown("**系统总资源**")
-        sys_df = pd.DataFrame(
-            [st.session_state.sys_resource],
-            columns=[f"资源{i}" for i in range(st.session_state.m)],
-            index=["总量"]
-        )
-        st.dataframe(sys_df.style.map(
-            lambda x: 'color: blue' if x == min(st.session_state.sys_resource) else 'color: pink' if x == max(
-                st.session_state.sys_resource) else ''))
+        show_matrix(st.session_state.sys_resource, col_prefix="资源", index=["总量"], style="highlight")
 
     with resources[1]:
         st.markdown("**可用资源**")
-        avail_df = pd.DataFrame(
-            [st.session_state.available],
-            columns=[f"资源{i}" for i in range(st.session_state.m)],
-            index=["可用量"]
-        )
-        st.dataframe(avail_df.style.map(
-            lambda x: 'color: blue' if x == min(st.session_state.available) else 'color: pink' if x == max(
-                st.session_state.available) else ''))
+        show_matrix(st.session_state.available, col_prefix="资源", index=["可用量"], style="highlight")
         #%%
     # 显示矩阵
     st.subheader("资源分配矩阵")
@@ -843,66 +981,67 @@ def page_simulator():
 
     with col1:
         st.write("最大分配矩阵")
-        st.dataframe(pd.DataFrame(
-            st.session_state.max_alloc,
-            columns=[f"R{i}" for i in range(st.session_state.m)],
-            index=[f"P{i}" for i in range(st.session_state.n)]
-        ))
+        show_matrix(st.session_state.max_alloc, "sim_max", style="heatmap")
 
     with col2:
         st.write("已分配矩阵")
-        st.dataframe(pd.DataFrame(
-            st.session_state.alloc,
-            columns=[f"R{i}" for i in range(st.session_state.m)],
-            index=[f"P{i}" for i in range(st.session_state.n)]
-        ))
+        show_matrix(st.session_state.alloc, "sim_alloc", style="heatmap")
 
     with col3:
         st.write("需求矩阵")
-        st.dataframe(pd.DataFrame(
-            st.session_state.need,
-            columns=[f"R{i}" for i in range(st.session_state.m)],
-            index=[f"P{i}" for i in range(st.session_state.n)]
-        ))
+        show_matrix(st.session_state.need, "sim_need", style="heatmap")
 
     with col4:
-        if any(st.session_state.reqs):
-            pid, req = st.session_state.reqs[st.session_state.tick]
-            reqd=deepcopy(st.session_state.sys_resource)
-            for i in range(st.session_state.m):
-                reqd[i]=req[i]
+        if st.session_state.sim.current() is None:
+            st.markdown("请求序列已处理完毕")
+        else:
+            pid, reqd = st.session_state.sim.current()
 
             st.markdown(f"进程ID: {pid}请求资源")
-            sys_df = pd.DataFrame(
-                [reqd],
-                columns=[f"资源{i}" for i in range(st.session_state.m)],
-                index=["总量"]
-            )
-            st.dataframe(sys_df.style.map(
-                lambda x: 'color: blue' if x == min(reqd) else 'color: pink' if x == max(
-                    reqd) else ''))
+            show_matrix(reqd, col_prefix="资源", index=["总量"], style="highlight")
 
 
     # 安全序列计算
     st.subheader("安全序列分析")
-    safe_sequences = bankers_algorithm()
+    analysis = analyze_safe_sequences()
+    safe_sequences = analysis["sequences"]
     st.session_state.state=any(safe_sequences)
 
-    if safe_sequences:
+    if safe_sequences and is_large():
+        prefix = " -> ".join(f"P{p}" for p in safe_sequences[0][:PREVIEW_ROWS])
+        more = f" -> …（共{st.session_state.n}个进程）" if st.session_state.n > PREVIEW_ROWS else ""
+        st.success(f"{'初始状态' if st.session_state.tick == 0 else f'对tick<{st.session_state.tick}的请求做分配后'}"
+                   f"系统安全，可计算下一个")
+        st.info(f"安全性检查给出的安全序列，资源利用率 {analysis['efficiencies'][0]:.2%}")
+        st.code(prefix + more)
+        st.caption("大规模系统不枚举、不计数安全序列")
+
+    elif safe_sequences:
+        # 等价进程只展开一种顺序，总数由计数引擎给出
+        total = analysis["total"]
+        total = f"{total}" if analysis["exact"] else f"约{format_count(total)}"
+        if analysis["truncated"] or analysis["multiplicity"] > 1:
+            found = f"展示前{len(safe_sequences)}个 / 共{total}个安全序列"
+        else:
+            found = f"找到 {total} 个安全序列"
         if st.session_state.tick==0:
-            st.success(f"初始状态，找到{len(safe_sequences)} 个安全序列，可计算下一个")
+            st.success(f"初始状态，{found}，可计算下一个")
         else:
-            st.success(f"对tick<{st.session_state.tick}的请求做分配后，找到 {len(safe_sequences)} 个安全序列，可计算下一个")
+            st.success(f"对tick<{st.session_state.tick}的请求做分配后，{found}，可计算下一个")
+        if analysis["multiplicity"] > 1:
+            st.caption("Alloc与Need完全相同的进程可互换，仅展示其按编号递增的顺序")
         # for seq in safe_sequences:
         #     st.code(" → ".join([f"P{p}" for p in seq]))
-        system = {
-            "resources": deepcopy(st.session_state.sys_resource),  # 系统总资源
-            "available": deepcopy(st.session_state.available),  # 可用资源
-            "allocation": deepcopy(st.session_state.alloc),
-        }
         # 在Streamlit中展示
         st.title("安全序列及其评分")
-        display_safe_sequences(safe_sequences, system)
+        best_seq, best_score, exact = analysis["optimum"]
+        if best_seq:
+            st.info(f"{'最优' if exact else '近似最优'}安全序列："
+                    f"{' -> '.join(f'P{p}' for p in best_seq)}，资源利用率 {best_score:.2%}")
+        display_safe_sequences(safe_sequences, analysis["efficiencies"])
+        if st.session_state.n <= FULL_ENUM_MAX_N:
+            with st.expander("🧮 完整枚举（多进程）"):
+                show_full_enumeration()
 
     else:
         st.error("当前状态不安全！请跳过该分配请求！")
@@ -914,15 +1053,22 @@ def page_simulator():
             process_next()
         if not st.session_state.state and st.button("⏩ 跳过",use_container_width=True):
             skip_request()
+
+    # 快进：在按钮回调中连续处理请求，本次渲染只显示最终状态
+    with st.expander("⏩ 快进"):
+        ff = st.columns(4)
+        sim = st.session_state.sim
+        # 请求序列按块生成时总长度未知，不设上限
+        max_ticks = None if sim.pending else max(len(sim.trace), 1)
+        ff[0].number_input("tick数", 1, max_ticks, min(10, max_ticks or 10),
+                           key="ff_ticks", label_visibility="collapsed")
+        ff[1].button("运行N个tick", on_click=fast_forward, args=("ticks",), use_container_width=True)
+        ff[2].button("运行到下一次拒绝", on_click=fast_forward, args=("denial",), use_container_width=True)
+        ff[3].button("运行到结束", on_click=fast_forward, args=("end",), use_container_width=True)
+
     # 显示请求序列
     st.subheader("生成的请求序列")
-    req_df = pd.DataFrame(
-        [(i, req[0], req[1]) for i, req in enumerate(st.session_state.reqs)],
-        columns=["Tick", "进程ID", "请求资源"]
-    )
-    st.dataframe(
-        req_df.style.apply(lambda x: ['background: lightblue' if x.name % 2 == 0 else '' for i in x], axis=1),
-        height=250)
+    show_reqs("sim_reqs", current=st.session_state.tick)
 
     if col3.button("🏠 返回首页",use_container_width=True):
         st.session_state.page = "welcome"
@@ -930,68 +1076,69 @@ def page_simulator():
 
 
 def calculate_available():
-    alloc_sum = [sum(col) for col in zip(*st.session_state.alloc)]
-    return [st.session_state.sys_resource[i] - alloc_sum[i]
-            for i in range(st.session_state.m)]
+    return st.session_state.sim.available
 
 
-def bankers_algorithm():
-    available = calculate_available()
-    need = deepcopy(st.session_state.need)
-    alloc = deepcopy(st.session_state.alloc)
-    sequences = []
+def bankers_algorithm(max_count=SEQ_LIMIT, time_budget=SEQ_TIME_BUDGET):
+    """枚举当前状态的安全序列，返回序列列表及枚举器（含截断信息）"""
+    enumerator = SafeSequenceEnumerator(
+        st.session_state.alloc, st.session_state.need, calculate_available(),
+        max_count=max_count, time_budget=time_budget)
+    return list(enumerator), enumerator
 
-    def dfs(seq, work, finish):
-        if len(seq) == st.session_state.n:
-            sequences.append(seq)
-            return
 
-        for i in range(st.session_state.n):
-            if not finish[i] and all(need[i][j] <= work[j] for j in range(st.session_state.m)):
-                new_work = [work[j] + alloc[i][j] for j in range(st.session_state.m)]
-                new_finish = finish.copy()
-                new_finish[i] = True
-                dfs(seq + [i], new_work, new_finish)
+def format_count(count):
+    """以科学计数法显示大整数（可超出浮点范围）"""
+    digits = str(count)
+    if len(digits) <= 6:
+        return digits
+    return f"{digits[0]}.{digits[1:3]}e{len(digits) - 1}"
 
-    dfs([], available, [False] * st.session_state.n)
-    return sequences
 
+def count_safe_sequences():
+    """统计当前状态的安全序列个数，返回(个数, 是否精确)"""
+    return count_sequences(st.session_state.alloc, st.session_state.need,
+                           calculate_available(), exact_max_n=COUNT_EXACT_MAX_N)
 
+
+@timed("process_next")
 def process_next():
-    if st.session_state.tick >= len(st.session_state.reqs)-1:
+    sim = st.session_state.sim
+    if sim.done:
         st.error("已经是最后一个请求！")
         return
 
-    pid, req = st.session_state.reqs[st.session_state.tick]
-    available = calculate_available()
-
-    # 尝试分配资源
-    # 合法性检查
-    if all(req[j] <= st.session_state.need[pid][j] for j in range(st.session_state.m)) and \
-            all(req[j] <= available[j] for j in range(st.session_state.m)):
-
-        # 预分配
-        for j in range(st.session_state.m):
-            st.session_state.alloc[pid][j] += req[j]
-            st.session_state.need[pid][j] -= req[j]
-            available[j] -= req[j]
-
-        # 检查是否完成
-        if all(n == 0 for n in st.session_state.need[pid]):
-            # 释放资源
-            for j in range(st.session_state.m):
-                available[j] += st.session_state.alloc[pid][j]
-                st.session_state.alloc[pid][j] = 0
-
-    st.session_state.tick += 1
+    # 分配请求，需求满足后释放资源
+    sim.step()
+    metrics().inc("requests_processed")
+    st.session_state.tick = sim.tick
 
 
+@timed("skip_request")
 def skip_request():
-    if st.session_state.tick >= len(st.session_state.reqs)-1:
+    sim = st.session_state.sim
+    if sim.done:
         st.error("已经是最后一个请求！")
         return
 
-    st.session_state.tick += 1
+    sim.skip()
+    metrics().inc("requests_processed")
+    st.session_state.tick = sim.tick
+
+
+@timed("fast_forward")
+def fast_forward(mode):
+    """快进：ticks运行N个tick，denial运行到下一次拒绝，end运行到结束"""
+    sim = st.session_state.sim
+    if mode == "ticks":
+        summary = sim.run(ticks=st.session_state.ff_ticks)
+    elif mode == "denial":
+        summary = sim.run(until_denial=True)
+    else:
+        summary = sim.run()
+    metrics().inc("requests_processed", summary["ticks"])
+    st.session_state.tick = sim.tick
+    st.session_state.ff_summary = summary
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+# benchmarks/__main__.py
+"""基准测试：python -m benchmarks
+
+对每个用例测量吞吐量(ops/sec)、单次调用延迟的p50/p99及tracemalloc记录的峰值内存，
+结果写为JSON；给出基线文件时逐项比较p50，变慢超过阈值即以非零状态退出。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.cases import PROFILES, cases
+
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+
+def measure(prepare, run, min_time: float, max_repeats: int, min_repeats: int = 5) -> dict:
+    """重复调用直到累计min_time秒或max_repeats次，返回统计结果"""
+    run(*prepare())  # 预热
+    latencies = []
+    total = 0.0
+    while len(latencies) < max_repeats and (total < min_time or len(latencies) < min_repeats):
+        args = prepare()
+        start = time.perf_counter()
+        run(*args)
+        elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+        total += elapsed
+
+    # 峰值内存单独测一次，避免tracemalloc拖慢计时
+    args = prepare()
+    tracemalloc.start()
+    run(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = np.array(latencies)
+    return {
+        "repeats": len(latencies),
+        "ops_per_sec": len(latencies) / total if total > 0 else None,
+        "p50_ms": float(np.percentile(latencies, 50) * 1e3),
+        "p99_ms": float(np.percentile(latencies, 99) * 1e3),
+        "peak_kib": peak / 1024,
+    }
+
+
+def result_key(result: dict) -> str:
+    """用例名与参数组成的比较键"""
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def compare(results, baseline, threshold: float) -> list:
+    """与基线逐项比较p50，返回变慢超过threshold的(键, 基线, 当前, 比值)"""
+    previous = {result_key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get(result_key(r))
+        if old is None or not old["p50_ms"]:
+            continue
+        ratio = r["p50_ms"] / old["p50_ms"]
+        r["baseline_p50_ms"] = old["p50_ms"]
+        r["ratio"] = ratio
+        if ratio > 1 + threshold:
+            regressions.append((result_key(r), old["p50_ms"], r["p50_ms"], ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="lib热点路径基准测试")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick", help="参数网格档位")
+    parser.add_argument("--filter", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每个用例的最少计时秒数")
+    parser.add_argument("--max-repeats", type=int, default=1000, help="每个用例的最多调用次数")
+    parser.add_argument("-o", "--output", help="结果JSON的输出路径")
+    parser.add_argument("--baseline", help=f"基线JSON，缺省时使用存在的{DEFAULT_BASELINE}")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p50变慢超过该比例视为退化")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name, params, case in cases(args.profile):
+        if args.filter and args.filter not in name:
+            continue
+        prepare, run = case(**params)
+        stats = measure(prepare, run, args.min_time, args.max_repeats)
+        result = {"name": name, "params": params, **stats}
+        results.append(result)
+        print(f"{result_key(result):<48} {stats['ops_per_sec']:>12.1f} ops/s  "
+              f"p50 {stats['p50_ms']:>9.3f} ms  p99 {stats['p99_ms']:>9.3f} ms  "
+              f"peak {stats['peak_kib']:>10.1f} KiB", file=sys.stderr)
+
+    regressions = []
+    baseline_path = args.baseline
+    if baseline_path is None and os.path.exists(DEFAULT_BASELINE):
+        baseline_path = DEFAULT_BASELINE
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for key, old, new, ratio in regressions:
+            print(f"退化 {key}: p50 {old:.3f} ms -> {new:.3f} ms ({ratio:.2f}x)", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "profile": args.profile,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "baseline": baseline_path,
+        },
+        "results": results,
+        "regressions": [key for key, *_ in regressions],
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
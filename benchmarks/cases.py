@@ -0,0 +1,155 @@
+# benchmarks/cases.py
+"""基准用例：每个用例按参数构造数据，返回(prepare, run)
+
+prepare()在计时之外执行，返回本次调用run的参数；run(*args)为被计时的调用。
+所有数据由固定种子生成，结果可复现。
+"""
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+
+from lib.core import (bankers_algorithm, calneed, initalloc, initconfig, initmaxalloc,
+                      initreqs, initstate, process_requests, safety_check)
+from lib.montecarlo import simulate_shard
+from lib.sequences import ParallelSequenceEnumerator, SafeSequenceEnumerator, score_sequences
+
+SEED = 20240601
+
+# 各档位的参数网格
+PROFILES = {
+    "quick": {
+        "sizes": [(10, 3), (100, 8), (1000, 16)],
+        "traces": [1000, 10000],
+        "enum_n": [8, 10],
+        "full_enum_n": [8],
+        "montecarlo": [256],
+    },
+    "full": {
+        "sizes": [(10, 3), (100, 8), (1000, 16), (10000, 32), (100000, 64)],
+        "traces": [1000, 10000, 100000],
+        "enum_n": [8, 10, 12],
+        "full_enum_n": [9, 11],
+        "montecarlo": [256, 4096],
+    },
+}
+
+
+def safe_state(n: int, m: int, rng: np.random.Generator) -> (np.ndarray, np.ndarray, np.ndarray):
+    """随机生成一个安全状态(alloc, need, available)
+
+    按随机顺序逐个确定进程的需求，使其不超过之前的进程全部完成后的work，该顺序即为安全序列。
+    """
+    alloc = rng.integers(0, 5, size=(n, m))
+    available = rng.integers(0, 5, size=m)
+    need = np.empty_like(alloc)
+    work = available.copy()
+    for i in rng.permutation(n):
+        need[i] = rng.integers(0, work + 1)
+        work += alloc[i]
+    return alloc, need, available
+
+
+def _fixed(*args) -> Callable[[], Tuple]:
+    """每次调用参数相同的prepare"""
+    return lambda: args
+
+
+def case_initmaxalloc(n, m):
+    sys_resource = np.full(m, 20)
+    return _fixed(n, m, sys_resource, SEED), initmaxalloc
+
+
+def case_initalloc(n, m):
+    max_alloc = initmaxalloc(n, m, np.full(m, 20), SEED)
+    return _fixed(max_alloc, SEED), initalloc
+
+
+def case_initreqs(n, m):
+    sys_resource, max_alloc, alloc = initconfig(n, m, 5, 20, SEED)
+    return _fixed(n, m, calneed(max_alloc, alloc), SEED), initreqs
+
+
+def case_safety_check(n, m, method):
+    alloc, need, available = safe_state(n, m, np.random.default_rng(SEED))
+    return _fixed(alloc, need, available, method), safety_check
+
+
+def case_bankers_algorithm(n, m):
+    rng = np.random.default_rng(SEED)
+    alloc, need, available = safe_state(n, m, rng)
+    pids = rng.integers(0, n, size=64)
+
+    def prepare():
+        pid = int(pids[prepare.k % len(pids)])
+        prepare.k += 1
+        return alloc, need, available, {"pid": pid, "request": np.minimum(need[pid] // 2, available)}
+    prepare.k = 0
+    return prepare, bankers_algorithm
+
+
+def case_admission(n, m, length):
+    """按lib.core.admit处理length个请求，每次从同一初始状态开始"""
+    rng = np.random.default_rng(SEED)
+    alloc, need, available = safe_state(n, m, rng)
+    state = initstate(available + alloc.sum(axis=0), alloc + need, alloc, seed=SEED)
+    index = rng.integers(0, len(state["pids"]), size=length) if len(state["pids"]) else np.zeros(length, int)
+    pids = state["pids"][index] if len(state["pids"]) else np.zeros(length, np.int32)
+    reqs = state["reqs"][index] if len(state["pids"]) else np.zeros((length, m), np.int32)
+
+    def prepare():
+        fresh = {key: state[key].copy() for key in ("alloc", "need", "available")}
+        return fresh, reqs, pids
+    return prepare, process_requests
+
+
+def case_enumerate(n, m, max_count=200):
+    """app.py中安全序列分析所用的深度优先枚举"""
+    alloc, need, available = safe_state(n, m, np.random.default_rng(SEED))
+    return (_fixed(alloc, need, available, max_count),
+            lambda *args: list(SafeSequenceEnumerator(*args)))
+
+
+def case_full_enumerate(n, m, workers):
+    """完整枚举全部安全序列：workers=0为单进程，否则按前缀拆分到进程池"""
+    alloc, need, available = safe_state(n, m, np.random.default_rng(SEED))
+    if workers == 0:
+        return _fixed(alloc, need, available), lambda *args: list(SafeSequenceEnumerator(*args))
+    return (_fixed(alloc, need, available, workers),
+            lambda *args: list(ParallelSequenceEnumerator(*args)))
+
+
+def case_score_sequences(n, m, count=200):
+    """app.py中安全序列分析所用的批量评分"""
+    rng = np.random.default_rng(SEED)
+    alloc, _, available = safe_state(n, m, rng)
+    sequences = np.argsort(rng.random((count, n)), axis=1)
+    return _fixed(sequences, alloc, available, available + alloc.sum(axis=0)), score_sequences
+
+
+def case_montecarlo(batch, n, m):
+    """lib.montecarlo的单个分片：生成batch个系统并批量检查、处理请求"""
+    return _fixed(batch, n, m, 20, 5, SEED), simulate_shard
+
+
+def cases(profile: str) -> List[Tuple[str, Dict, Callable]]:
+    """按档位展开全部(用例名, 参数, 构造函数)"""
+    grid = PROFILES[profile]
+    result = []
+    for n, m in grid["sizes"]:
+        result.append(("initmaxalloc", {"n": n, "m": m}, case_initmaxalloc))
+        result.append(("initalloc", {"n": n, "m": m}, case_initalloc))
+        result.append(("initreqs", {"n": n, "m": m}, case_initreqs))
+        for method in ("batched", "sorted"):
+            result.append(("safety_check", {"n": n, "m": m, "method": method}, case_safety_check))
+        result.append(("bankers_algorithm", {"n": n, "m": m}, case_bankers_algorithm))
+        result.append(("score_sequences", {"n": n, "m": m}, case_score_sequences))
+    n, m = grid["sizes"][1]
+    for length in grid["traces"]:
+        result.append(("admission", {"n": n, "m": m, "length": length}, case_admission))
+    for n in grid["enum_n"]:
+        result.append(("enumerate", {"n": n, "m": 3}, case_enumerate))
+    for n in grid["full_enum_n"]:
+        for workers in (0, 2, 4):
+            result.append(("full_enumerate", {"n": n, "m": 3, "workers": workers}, case_full_enumerate))
+    for batch in grid["montecarlo"]:
+        result.append(("montecarlo", {"batch": batch, "n": 10, "m": 3}, case_montecarlo))
+    return result
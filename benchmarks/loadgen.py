@@ -0,0 +1,191 @@
+# benchmarks/loadgen.py
+"""准入服务的压力测试：python -m benchmarks.loadgen
+
+开多个连接向lib.server流水线式发送请求，每个连接最多window个未响应的请求，
+统计每秒判定数、延迟的p50/p99及各判定结果的比例，结果写为JSON。
+每个连接代表一组互不相交的进程，像作业一样申请各自的剩余需求：请求量按initreqs的方式
+从尚未申请的剩余需求中随机拆出，同一进程在途请求之和不超过服务端的需求；被拒绝的请求量退回
+后重新拆分申请，进程完成后按服务端的recycle重新从最大需求开始。请求因此始终与服务端的状态一致，
+不会因超过需求被拒绝。--spawn时自行启动一个服务端子进程。没有任何请求获批时以非零状态退出。
+"""
+import argparse
+import asyncio
+import json
+import re
+import subprocess
+import sys
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+RESULT = re.compile(rb'"result": "(\w+)"')
+RELEASED = b'"released": true'
+# 获批请求的比例低于该值时给出警告
+GRANT_WARNING = 0.01
+# 状态查询的响应包含整个需求矩阵，按行读取时放宽长度上限
+STATE_LIMIT = 1 << 26
+
+
+async def fetch_state(host: str, port: int) -> dict:
+    """查询服务端的当前状态"""
+    reader, writer = await asyncio.open_connection(host, port, limit=STATE_LIMIT)
+    writer.write(b'{"op": "state"}\n')
+    state = json.loads(await reader.readline())
+    writer.close()
+    return state
+
+
+def split_requests(free: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """从每行剩余需求中拆出一个请求：剩余为正的资源取[1, 剩余]上的随机数，与initreqs相同"""
+    reqs = (rng.random(free.shape) * free).astype(free.dtype) + 1
+    reqs[free <= 0] = 0
+    return reqs
+
+
+async def client(host: str, port: int, pids: np.ndarray, need: np.ndarray, claims: np.ndarray,
+                 recycle: bool, count: int, window: int, seed: int, latencies: list, results: Counter):
+    """单个连接：为pids中的进程共发送count个请求，保持最多window个未响应，窗口过半时补发一轮"""
+    rng = np.random.default_rng(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    free = need[pids].copy()  # 各进程尚未申请的剩余需求
+    sent = deque()  # (本地下标, 请求, 发送时刻)
+    k = 0
+    offset = 0
+    rest = b""
+    while True:
+        if k < count and len(sent) <= window // 2:
+            # 每轮为每个仍有剩余需求的进程拆出一个请求，起点轮转以免总是优先编号小的进程
+            rows = np.roll(np.flatnonzero(free.any(axis=1)), -offset)[:min(window - len(sent), count - k)]
+            offset += len(rows)
+            if len(rows):
+                reqs = split_requests(free[rows], rng)
+                free[rows] -= reqs
+                now = time.perf_counter()
+                lines = []
+                for i, pid, req, row in zip(rows.tolist(), pids[rows].tolist(), reqs.tolist(), reqs):
+                    lines.append(f'{{"id": {k}, "pid": {pid}, "request": {req}}}\n')
+                    sent.append((i, row, now))
+                    k += 1
+                writer.write("".join(lines).encode())
+                await writer.drain()
+        if not sent:
+            break
+        data = await reader.read(1 << 16)
+        if not data:
+            raise ConnectionError("服务端关闭了连接")
+        lines = (rest + data).split(b"\n")
+        rest = lines.pop()
+        now = time.perf_counter()
+        denied, returned, released = [], [], []
+        for line in lines:
+            i, req, started = sent.popleft()
+            latencies.append(now - started)
+            match = RESULT.search(line)
+            result = match.group(1).decode() if match else "error"
+            results[result] += 1
+            if result != "granted":
+                denied.append(i)
+                returned.append(req)
+            elif RELEASED in line:
+                released.append(i)
+        # 被拒绝的请求量退回；完成时该进程的请求都已获批，服务端按recycle重新声明最大需求
+        if denied:
+            np.add.at(free, denied, returned)
+        if released:
+            free[released] = claims[pids[released]] if recycle else 0
+    writer.close()
+
+
+async def run(host: str, port: int, connections: int, total: int, window: int, seed: int) -> dict:
+    state = await fetch_state(host, port)
+    n, m = state["n"], state["m"]
+    need = np.array(state["need"], dtype=np.int64).reshape(n, m)
+    recycle = bool(state.get("recycle")) and state.get("max") is not None
+    claims = np.array(state["max"], dtype=np.int64).reshape(n, m) if recycle else need
+    connections = max(min(connections, n), 1)
+    per_client = [total // connections + (c < total % connections) for c in range(connections)]
+    latencies, results = [], Counter()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, np.arange(c, n, connections), need, claims, recycle,
+                                  count, window, seed + c, latencies, results)
+                           for c, count in enumerate(per_client)))
+    seconds = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1e3
+    return {
+        "n": state["n"],
+        "m": state["m"],
+        "connections": connections,
+        "window": window,
+        "recycle": recycle,
+        "decisions": len(latencies),
+        "seconds": seconds,
+        "decisions_per_sec": len(latencies) / seconds if seconds > 0 else None,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+        "results": dict(results),
+    }
+
+
+def spawn_server(server_args: list) -> (subprocess.Popen, str, int):
+    """启动服务端子进程（任意空闲端口），返回(进程, 地址, 端口)"""
+    proc = subprocess.Popen([sys.executable, "-m", "lib.server", "--port", "0", *server_args],
+                            stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line:
+        proc.wait()
+        raise RuntimeError(f"服务端启动失败，退出码{proc.returncode}")
+    info = json.loads(line)
+    return proc, info["host"], info["port"]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadgen", description="准入服务压力测试")
+    parser.add_argument("--host", default="127.0.0.1", help="服务端地址")
+    parser.add_argument("--port", type=int, default=8765, help="服务端端口")
+    parser.add_argument("--spawn", action="store_true", help="自行启动服务端子进程")
+    parser.add_argument("--server-args", nargs=argparse.REMAINDER, default=[],
+                        help="--spawn时传给lib.server的参数，须放在最后，如--server-args -n 1000 --no-sequence")
+    parser.add_argument("-c", "--connections", type=int, default=8, help="并发连接数")
+    parser.add_argument("-r", "--requests", type=int, default=100000, help="请求总数")
+    parser.add_argument("-w", "--window", type=int, default=256, help="每个连接最多未响应的请求数")
+    parser.add_argument("--seed", type=int, default=0, help="请求拆分的随机种子")
+    parser.add_argument("-o", "--output", help="结果JSON的输出路径")
+    args = parser.parse_args(argv)
+
+    proc = None
+    host, port = args.host, args.port
+    if args.spawn:
+        proc, host, port = spawn_server(args.server_args)
+    try:
+        report = asyncio.run(run(host, port, args.connections, args.requests, args.window, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    results = report["results"]
+    mix = "  ".join(f"{name} {results.get(name, 0) / max(report['decisions'], 1):.1%}"
+                    for name in ("granted", "denied_need", "denied_available", "denied_unsafe", "error"))
+    print(f"{report['decisions_per_sec']:.0f} decisions/s  p50 {report['p50_ms']:.3f} ms  "
+          f"p99 {report['p99_ms']:.3f} ms\n{mix}", file=sys.stderr)
+    text = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    # 只有前置检查的拒绝时，测得的吞吐量不包含安全检查
+    if not results.get("denied_unsafe"):
+        print("警告：没有请求因不安全被拒绝，安全检查可能很少执行", file=sys.stderr)
+    if not results.get("granted"):
+        print("错误：没有任何请求获批，负载没有测到准入判定", file=sys.stderr)
+        return 1
+    if results["granted"] < GRANT_WARNING * report["decisions"]:
+        print("警告：获批的请求不足1%，吞吐量主要反映前置检查的拒绝", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
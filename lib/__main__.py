@@ -0,0 +1,141 @@
+# lib/__main__.py
+"""命令行批量分析：python -m lib
+
+载入或生成一个场景，用lib.core的准入判定处理完整的请求序列，以JSON输出吞吐量、
+各判定结果的计数及安全性统计。
+"""
+import argparse
+import json
+import sys
+import time
+
+# 不依赖界面的模块；--lean时在导入它们之前屏蔽streamlit与pandas
+HEAVY_MODULES = ("streamlit", "pandas")
+
+
+def add_source_arguments(parser: argparse.ArgumentParser) -> None:
+    """添加场景来源与随机生成的参数，供build_state使用"""
+    source = parser.add_argument_group("场景来源（缺省时随机生成）")
+    source.add_argument("--scenario", help="场景文件（.bks），请求序列按内存映射读取")
+    source.add_argument("--state", help="状态文件（.csv或.jsonl）")
+    source.add_argument("--requests", help="请求文件（.csv或.jsonl），缺省时随机生成")
+    source.add_argument("--sys", help="系统资源，逗号分隔（CSV状态文件必需）")
+
+    generate = parser.add_argument_group("随机生成")
+    generate.add_argument("-n", type=int, default=10, help="进程数")
+    generate.add_argument("-m", type=int, default=3, help="资源种类数")
+    generate.add_argument("--maxnum", type=int, default=20, help="系统资源上限")
+    generate.add_argument("--lowest", type=int, default=5, help="系统资源下限")
+    generate.add_argument("--generator", choices=("config", "independent", "safe"), default="config",
+                          help="config：initconfig逐行从剩余资源中抽取，已分配之和不超过系统资源；"
+                               "independent：initsysresource/initmaxalloc/initalloc逐项独立生成；"
+                               "safe：initsafeconfig生成一个安全状态")
+    generate.add_argument("--padding", type=int, default=5, help="请求序列末尾的空请求数")
+    generate.add_argument("--seed", type=int, help="随机种子")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="每次读取或处理的请求数")
+    parser.add_argument("--method", choices=("auto", "batched", "sorted"), default="auto",
+                        help="安全检查方法，见lib.core.safety_check")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m lib", description="银行家算法批量分析")
+    add_source_arguments(parser)
+    parser.add_argument("--save", help="把生成或导入的场景另存为场景文件")
+    parser.add_argument("--count", action="store_true", help="统计初始状态的安全序列个数")
+    parser.add_argument("--lean", action="store_true",
+                        help="屏蔽streamlit与pandas的导入，保证启动开销只有numpy")
+    parser.add_argument("--indent", type=int, help="JSON缩进")
+    return parser.parse_args(argv)
+
+
+def block_heavy_modules():
+    """把界面依赖置为不可导入，误用时立即报ImportError而不是拖慢启动"""
+    for name in HEAVY_MODULES:
+        if name not in sys.modules:
+            sys.modules[name] = None
+
+
+def build_state(args):
+    """按参数载入或生成场景，返回(状态字典, 来源说明)"""
+    import numpy as np
+    from lib.core import initalloc, initconfig, initmaxalloc, initsafeconfig, initstate, initsysresource
+
+    if args.scenario:
+        from lib.scenario import load_scenario
+        return load_scenario(args.scenario), args.scenario
+
+    if args.state:
+        from lib.ingest import parse_vector, read_requests, read_state
+        sys_resource = parse_vector(args.sys) if args.sys else None
+        sys_resource, max_alloc, alloc = read_state(args.state, sys_resource, chunk_size=args.chunk_size)
+        state = initstate(sys_resource, max_alloc, alloc, seed=args.seed, padding=args.padding)
+        if args.requests:
+            n, m = alloc.shape
+            state["pids"], state["reqs"] = read_requests(args.requests, n, m, chunk_size=args.chunk_size)
+        return state, args.state
+
+    rng = np.random.default_rng(args.seed)
+    if args.generator == "independent":
+        sys_resource = initsysresource(args.m, args.maxnum, args.lowest, rng)
+        max_alloc = initmaxalloc(args.n, args.m, sys_resource, rng)
+        alloc = initalloc(max_alloc, rng)
+    elif args.generator == "safe":
+        sys_resource, max_alloc, alloc = initsafeconfig(args.n, args.m, args.lowest, args.maxnum, rng)
+    else:
+        sys_resource, max_alloc, alloc = initconfig(args.n, args.m, args.lowest, args.maxnum, rng)
+    # 请求序列由initstate经initreqs生成
+    state = initstate(sys_resource, max_alloc, alloc, seed=rng, padding=args.padding)
+    return state, f"random({args.generator})"
+
+
+def analyze(state, args) -> dict:
+    """处理完整的请求序列，返回统计结果"""
+    from lib.core import count_safe_sequences, safety_check
+    from lib.scenario import replay_scenario
+
+    n, m = state["alloc"].shape
+    result = {"n": n, "m": m}
+    safe, _ = safety_check(state["alloc"], state["need"], state["available"], method=args.method)
+    result["initial_safe"] = safe
+    if args.count:
+        count, exact = count_safe_sequences(state["alloc"], state["need"], state["available"],
+                                            seed=args.seed)
+        result["safe_sequences"] = {"count": count, "exact": exact}
+
+    start = time.perf_counter()
+    counts = replay_scenario(state, chunk_size=args.chunk_size, method=args.method)
+    seconds = time.perf_counter() - start
+    result.update(counts)
+    result["seconds"] = seconds
+    result["throughput"] = counts["requests"] / seconds if seconds > 0 else None
+    result["final_safe"] = safety_check(state["alloc"], state["need"], state["available"],
+                                        method=args.method)[0]
+    return result
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.lean:
+        block_heavy_modules()
+    from lib.ingest import ValidationError
+
+    started = time.perf_counter()
+    try:
+        state, source = build_state(args)
+    except (ValidationError, OSError) as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
+        return 1
+    if args.save:
+        from lib.scenario import save_scenario
+        save_scenario(args.save, state["sys_resource"], state["max_alloc"], state["alloc"],
+                      [(state["pids"], state["reqs"])])
+
+    result = {"source": source}
+    result.update(analyze(state, args))
+    result["total_seconds"] = time.perf_counter() - started
+    print(json.dumps(result, ensure_ascii=False, indent=args.indent))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
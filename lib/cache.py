@@ -0,0 +1,47 @@
+# lib/cache.py
+import hashlib
+import numpy as np
+from collections import OrderedDict
+
+
+def state_key(*arrays, **params) -> str:
+    """由若干数组的形状、类型、内容及附加参数计算缓存键"""
+    h = hashlib.blake2b(digest_size=16)
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(f"{a.shape}{a.dtype.str}".encode())
+        h.update(a.data)
+    h.update(repr(sorted(params.items())).encode())
+    return h.hexdigest()
+
+
+class LRUCache:
+    """容量受限的最近最少使用缓存"""
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        """取出缓存项并标记为最近使用"""
+        if key not in self.data:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    def put(self, key, value):
+        """写入缓存项，超出容量时淘汰最久未使用的项"""
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
@@ -1,31 +1,40 @@
 # lib/core.py
+import copy
+import itertools
+import math
+import time
 import numpy as np
-import random
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Tuple
 
+# 请求判定结果
+GRANTED = 0           # 分配
+DENIED_NEED = 1       # 超过声明的需求
+DENIED_AVAILABLE = 2  # 超过可用资源
+DENIED_UNSAFE = 3     # 分配后系统不安全
 
-def initsysresource(m: int, maxnum: int, lowestnum: int) -> np.ndarray:
+# safety_check(method="auto")按轮批量推进的最大轮数
+AUTO_ROUNDS = 32
+
+
+def initsysresource(m: int, maxnum: int, lowestnum: int, seed=None) -> np.ndarray:
     """初始化系统总资源"""
-    base = np.random.randint(lowestnum, maxnum, size=m)
-    return base
+    rng = np.random.default_rng(seed)
+    return rng.integers(lowestnum, maxnum, size=m)
 
 
-def initmaxalloc(n: int, m: int, sysresource: np.ndarray) -> np.ndarray:
-    """初始化最大需求矩阵"""
-    max_alloc = np.zeros((n, m), dtype=int)
-    for i in range(n):
-        for j in range(m):
-            max_alloc[i][j] = random.randint(0, sysresource[j])
-    return max_alloc
+def initmaxalloc(n: int, m: int, sysresource: np.ndarray, seed=None) -> np.ndarray:
+    """初始化最大需求矩阵，每项在[0, sysresource[j]]上均匀分布
 
+    seed可为整数或numpy.random.Generator，传入同一个Generator可串联多次生成。
+    """
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, np.asarray(sysresource) + 1, size=(n, m))
 
-def initalloc(max_alloc: np.ndarray) -> np.ndarray:
-    """初始化已分配矩阵"""
-    alloc = np.zeros_like(max_alloc)
-    for i in range(max_alloc.shape[0]):
-        for j in range(max_alloc.shape[1]):
-            alloc[i][j] = random.randint(0, max_alloc[i][j])
-    return alloc
+
+def initalloc(max_alloc: np.ndarray, seed=None) -> np.ndarray:
+    """初始化已分配矩阵，每项在[0, max_alloc[i][j]]上均匀分布"""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, max_alloc + 1)
 
 
 def calneed(max_alloc: np.ndarray, alloc: np.ndarray) -> np.ndarray:
@@ -33,31 +42,80 @@ def calneed(max_alloc: np.ndarray, alloc: np.ndarray) -> np.ndarray:
     return max_alloc - alloc
 
 
-def initreqs(n: int, m: int, need: np.ndarray) -> List[Dict]:
-    """生成请求序列"""
-    reqs = []
-    need_cp = need.copy()
+def _splitneed(need: np.ndarray, rng: np.random.Generator, offset: int = 0) -> (np.ndarray, np.ndarray):
+    """把每个进程的需求拆成若干请求，返回(进程号向量, 请求矩阵)
+
+    每轮对所有仍有剩余需求的进程同时抽取一行请求，剩余为正的资源取[1, 剩余]上的随机数，
+    与逐个进程拆分的分布相同；轮数约为log(最大需求)。
+    """
+    remain = need.copy()
+    pid_parts, req_parts = [], []
+    rows = np.flatnonzero((remain > 0).any(axis=1))
+    while rows.size:
+        sub = remain[rows]
+        draw = rng.integers(1, np.maximum(sub, 1) + 1, dtype=need.dtype)
+        draw[sub <= 0] = 0
+        remain[rows] = sub - draw
+        pid_parts.append(rows + offset)
+        req_parts.append(draw)
+        rows = rows[(remain[rows] > 0).any(axis=1)]
+    if not pid_parts:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, need.shape[1]), dtype=need.dtype)
+    return np.concatenate(pid_parts), np.concatenate(req_parts)
+
 
-    for pid in range(n):
-        while np.any(need_cp[pid] > 0):
-            req = []
-            for j in range(m):
-                if need_cp[pid][j] > 0:
-                    val = random.randint(1, need_cp[pid][j])
-                    req.append(val)
-                    need_cp[pid][j] -= val
-                else:
-                    req.append(0)
-            reqs.append({"pid": pid, "request": np.array(req)})
+def _padreqs(pids: np.ndarray, reqs: np.ndarray, padding: int) -> (np.ndarray, np.ndarray):
+    """在请求序列末尾添加进程0的空请求"""
+    if padding <= 0:
+        return pids, reqs
+    pids = np.concatenate([pids, np.zeros(padding, dtype=pids.dtype)])
+    reqs = np.concatenate([reqs, np.zeros((padding, reqs.shape[1]), dtype=reqs.dtype)])
+    return pids, reqs
+
+
+def initreqs(n: int, m: int, need: np.ndarray, seed=None, padding: int = 5) -> (np.ndarray, np.ndarray):
+    """生成请求序列，返回(进程号向量, R×m请求矩阵)
+
+    每个进程的请求之和恰好等于其需求，整体随机打乱后在末尾添加padding个空请求。
+    """
+    rng = np.random.default_rng(seed)
+    pids, reqs = _splitneed(need, rng)
 
     # 打乱请求顺序
-    random.shuffle(reqs)
+    perm = rng.permutation(len(pids))
+    return _padreqs(pids[perm], reqs[perm], padding)
+
+
+def iterreqs(need: np.ndarray, chunk_size: int = 65536, seed=None,
+             padding: int = 5) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """分块生成请求序列，每次产出不超过chunk_size行的(进程号向量, 请求矩阵)
 
-    # 添加padding
-    for _ in range(5):
-        reqs.append({"pid": 0, "request": np.zeros(m, dtype=int)})
+    进程按块拆分需求，请求只在同一块进程内打乱，内存占用与chunk_size成正比。
+    """
+    rng = np.random.default_rng(seed)
+    n = need.shape[0]
+    for start in range(0, n, chunk_size):
+        pids, reqs = _splitneed(need[start:start + chunk_size], rng, offset=start)
+        perm = rng.permutation(len(pids))
+        pids, reqs = pids[perm], reqs[perm]
+        for k in range(0, len(pids), chunk_size):
+            yield pids[k:k + chunk_size], reqs[k:k + chunk_size]
+    if padding > 0:
+        yield _padreqs(np.zeros(0, dtype=np.int64),
+                       np.zeros((0, need.shape[1]), dtype=need.dtype), padding)
 
-    return reqs
+
+def reqdtype(m: int) -> np.dtype:
+    """请求序列的结构化类型：进程号及m种资源的请求量"""
+    return np.dtype([("pid", np.int32), ("request", np.int32, (m,))])
+
+
+def packreqs(pids: np.ndarray, reqs: np.ndarray) -> np.ndarray:
+    """把(进程号向量, 请求矩阵)打包为结构化数组"""
+    trace = np.empty(len(pids), dtype=reqdtype(reqs.shape[1]))
+    trace["pid"] = pids
+    trace["request"] = reqs
+    return trace
 
 
 def refreshavailable(n: int, m: int, sysresource: np.ndarray, alloc: np.ndarray) -> np.ndarray:
@@ -65,12 +123,124 @@ def refreshavailable(n: int, m: int, sysresource: np.ndarray, alloc: np.ndarray)
     return sysresource - np.sum(alloc, axis=0)
 
 
+def initconfig(n: int, m: int, lowestnum: int, maxnum: int = 20,
+               seed=None) -> (np.ndarray, np.ndarray, np.ndarray):
+    """随机生成(系统总资源, 最大需求矩阵, 已分配矩阵)
+
+    系统资源取[0, maxnum]与lowestnum中的较大者；已分配矩阵逐行在[0, 剩余资源]上均匀抽取，
+    各列之和不超过系统资源；最大需求在[已分配, 系统资源]上均匀分布。
+    """
+    rng = np.random.default_rng(seed)
+    sysresource = np.maximum(rng.integers(0, maxnum + 1, size=m), lowestnum).astype(np.int32)
+
+    # 剩余资源为0的列之后只能抽到0，逐行抽取只需进行到各列都分完为止（期望约log(总量)行），
+    # 其余行全为0，大规模时不必逐行循环
+    alloc = np.zeros((n, m), dtype=np.int32)
+    remain = sysresource.copy()
+    for i in range(n):
+        if not remain.any():
+            break
+        alloc[i] = rng.integers(0, remain + 1)
+        remain -= alloc[i]
+
+    # 已分配 + floor(u·(总量-已分配+1))，比按数组上下界逐个抽整数快；舍入误差由上界截断
+    u = rng.random((n, m), dtype=np.float32)
+    u *= sysresource - alloc + 1
+    max_alloc = alloc + u.astype(np.int32)
+    np.minimum(max_alloc, sysresource, out=max_alloc)
+    return sysresource, max_alloc, alloc
+
+
+def initsafeconfig(n: int, m: int, lowestnum: int, maxnum: int = 20,
+                   seed=None) -> (np.ndarray, np.ndarray, np.ndarray):
+    """随机生成一个安全的(系统总资源, 最大需求矩阵, 已分配矩阵)
+
+    已分配在[0, lowestnum]上、初始可用资源在[lowestnum, maxnum]上均匀分布；按一个随机顺序，
+    每个进程的需求在[0, min(其前面的进程全部完成后的work, maxnum)]上均匀分布，该顺序即为一个安全序列。
+    """
+    rng = np.random.default_rng(seed)
+    alloc = rng.integers(0, lowestnum + 1, size=(n, m), dtype=np.int32)
+    available = rng.integers(lowestnum, maxnum + 1, size=m, dtype=np.int32)
+    order = rng.permutation(n)
+    rows = alloc[order]
+    work = rows.cumsum(axis=0, dtype=np.int32)
+    work -= rows
+    work += available
+    need = np.empty_like(alloc)
+    np.minimum(work, maxnum, out=work)
+    need[order] = (rng.random((n, m)) * (work + 1)).astype(np.int32)
+    return available + alloc.sum(axis=0, dtype=np.int32), alloc + need, alloc
+
+
+def initstate(sysresource, max_alloc, alloc, seed=None, padding: int = 0,
+              chunk_size: Optional[int] = None) -> Dict:
+    """由系统资源、最大需求与已分配矩阵生成完整的系统状态
+
+    返回包含sys_resource/max_alloc/alloc/need/available/pids/reqs的字典，均为int32数组。
+    指定chunk_size时请求序列按块惰性生成：pids/reqs只含第一块，其余块由chunks迭代器给出；
+    restart()重新生成一个与chunks相同的迭代器，供导出等不能共用chunks的场合使用。
+    """
+    sysresource = np.asarray(sysresource, dtype=np.int32)
+    max_alloc = np.asarray(max_alloc, dtype=np.int32)
+    alloc = np.asarray(alloc, dtype=np.int32)
+    n, m = alloc.shape
+    need = calneed(max_alloc, alloc)
+    state = {
+        "sys_resource": sysresource,
+        "max_alloc": max_alloc,
+        "alloc": alloc,
+        "need": need,
+        "available": refreshavailable(n, m, sysresource, alloc).astype(np.int32),
+    }
+    if chunk_size is None:
+        pids, reqs = initreqs(n, m, need, seed=seed, padding=padding)
+    else:
+        # 固定随机源的初始状态，使restart()能重现同一序列
+        origin = copy.deepcopy(seed) if isinstance(seed, np.random.Generator) else np.random.SeedSequence(seed)
+
+        def restart() -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+            chunks = iterreqs(need, chunk_size=chunk_size, seed=copy.deepcopy(origin), padding=padding)
+            return itertools.islice(chunks, 1, None)
+
+        chunks = iterreqs(need, chunk_size=chunk_size, seed=copy.deepcopy(origin), padding=padding)
+        pids, reqs = next(chunks, (np.zeros(0, dtype=np.int32), np.zeros((0, m), dtype=np.int32)))
+        state["chunks"] = chunks
+        state["restart"] = restart
+    state["pids"] = pids.astype(np.int32)
+    state["reqs"] = reqs
+    return state
+
+
 def bankers_algorithm(alloc: np.ndarray, need: np.ndarray,
                       available: np.ndarray, request: Dict) -> (bool, List):
     """银行家算法核心实现"""
-    pid = request['pid']
-    req = request['request']
+    return try_request(alloc, need, available, request['pid'], request['request'])
+
 
+def apply_request(alloc: np.ndarray, need: np.ndarray, available: np.ndarray,
+                  pid: int, req: np.ndarray) -> None:
+    """原地分配：只修改第pid行及可用资源向量"""
+    alloc[pid] += req
+    need[pid] -= req
+    available -= req
+
+
+def rollback_request(alloc: np.ndarray, need: np.ndarray, available: np.ndarray,
+                     pid: int, req: np.ndarray) -> None:
+    """撤销apply_request所做的分配"""
+    alloc[pid] -= req
+    need[pid] += req
+    available += req
+
+
+def try_request(alloc: np.ndarray, need: np.ndarray, available: np.ndarray,
+                pid: int, req: np.ndarray, commit: bool = False,
+                method: str = "batched") -> (bool, List):
+    """不复制矩阵地评估请求
+
+    试分配以第pid行的增量原地完成，安全检查后立即回滚；
+    commit=True且分配后安全时保留分配结果。
+    """
     # 步骤1：检查请求是否超过需求
     if np.any(req > need[pid]):
         return False, []
@@ -80,32 +250,281 @@ def bankers_algorithm(alloc: np.ndarray, need: np.ndarray,
         return False, []
 
     # 尝试分配
-    alloc_test = alloc.copy()
-    need_test = need.copy()
-    available_test = available.copy()
-
-    alloc_test[pid] += req
-    need_test[pid] -= req
-    available_test -= req
+    apply_request(alloc, need, available, pid, req)
 
     # 安全检查
-    work = available_test.copy()
-    finish = np.zeros(alloc.shape[0], dtype=bool)
+    try:
+        safe, safe_seq = safety_check(alloc, need, available, method)
+    except BaseException:
+        rollback_request(alloc, need, available, pid, req)
+        raise
+    if not (commit and safe):
+        rollback_request(alloc, need, available, pid, req)
+    return safe, safe_seq
+
+
+def check_order(alloc: np.ndarray, need: np.ndarray, available: np.ndarray,
+                order: np.ndarray, pid: int = None, req: np.ndarray = None) -> bool:
+    """验证order是否为安全序列
+
+    按order对Alloc做一次前缀和得到每一步的work，与Need逐行比较，O(n·m)。
+    给出pid与req时，order须是当前状态的安全序列，验证对第pid行试分配后是否仍成立：
+    只有排在pid之前的进程可用资源减少了req，因此只需检查这些行。
+    """
+    if len(order) != alloc.shape[0]:
+        return False
+    if pid is None:
+        head = order
+        offset = available
+    else:
+        if not req.any():
+            return True
+        head = order[:int(np.flatnonzero(order == pid)[0])]
+        offset = available - req
+    rows = alloc.take(head, axis=0)
+    work = rows.cumsum(axis=0)
+    work -= rows
+    work += offset
+    return bool((need.take(head, axis=0) <= work).all())
+
+
+def _safe_order(state: Dict, method: str = "auto"):
+    """当前状态的安全序列，不安全时为None；结果缓存在state中"""
+    if "safe_order" not in state:
+        safe, safe_seq = safety_check(state["alloc"], state["need"], state["available"], method)
+        state["safe_order"] = np.array(safe_seq, dtype=np.int64) if safe else None
+    return state["safe_order"]
+
+
+def admit(state: Dict, pid: int, req: np.ndarray, method: str = "auto") -> (int, bool):
+    """判定并执行单个请求，返回(判定结果, 是否释放了资源)
+
+    state为包含alloc/need/available数组的字典，原地修改；
+    上一次确认的安全序列缓存在state["safe_order"]，外部修改矩阵后需删除该键。
+    method为需要完整安全检查时所用的方法，见safety_check。
+    """
+    alloc, need, available = state["alloc"], state["need"], state["available"]
+
+    if (req > need[pid]).any():
+        return DENIED_NEED, False
+    if (req > available).any():
+        return DENIED_AVAILABLE, False
+
+    order = _safe_order(state, method)
+    if order is not None and (not req.any() or np.array_equal(req, need[pid])
+                              or check_order(alloc, need, available, order, pid, req)):
+        # 当前安全时，空请求不改变状态；补齐需求的请求使进程立即完成并归还资源；
+        # 其余请求先用上一次的安全序列做一次线性验证，成立则无需重新搜索
+        apply_request(alloc, need, available, pid, req)
+    else:
+        safe, safe_seq = try_request(alloc, need, available, pid, req, commit=True, method=method)
+        if not safe:
+            return DENIED_UNSAFE, False
+        state["safe_order"] = np.array(safe_seq, dtype=np.int64)
+
+    # 进程需求满足后释放资源
+    if not need[pid].any() and alloc[pid].any():
+        available += alloc[pid]
+        alloc[pid] = 0
+        return GRANTED, True
+    return GRANTED, False
+
+
+def process_requests(state: Dict, reqs: np.ndarray, pids: np.ndarray,
+                     method: str = "auto") -> (np.ndarray, np.ndarray):
+    """批量处理请求序列
+
+    reqs为(R, m)请求矩阵，pids为对应的进程号向量；按顺序逐个判定，
+    返回每个请求的判定结果(int8)及是否释放资源(bool)。
+    """
+    total = len(pids)
+    codes = np.empty(total, dtype=np.int8)
+    released = np.zeros(total, dtype=bool)
+    for k in range(total):
+        codes[k], released[k] = admit(state, int(pids[k]), reqs[k], method)
+    return codes, released
+
+
+def safety_check(alloc: np.ndarray, need: np.ndarray,
+                 available: np.ndarray, method: str = "batched") -> (bool, List):
+    """安全性检查，返回是否安全及一个安全序列
+
+    method="batched"：每轮用整个Need矩阵与work比较，一次释放所有可执行进程；
+    method="sorted"：按资源维护Need的有序索引，work增长时只推进指针，近线性时间；
+    method="auto"：先按batched推进，超过AUTO_ROUNDS轮（进程间依赖成链）后剩余部分改用sorted。
+    同一轮释放的进程按编号排列，结果确定。
+    """
+    if method == "sorted":
+        return _safety_sorted(alloc, need, available)
+    if method not in ("batched", "auto"):
+        raise ValueError(f"未知的安全检查方法: {method}")
+
+    n = alloc.shape[0]
+    work = available.copy()
+    finish = np.zeros(n, dtype=bool)
+    remain = np.arange(n)
+    safe_seq = []
+    rounds = 0
+
+    while remain.size:
+        if method == "auto" and rounds >= AUTO_ROUNDS:
+            safe, rest = _safety_sorted(alloc[remain], need[remain], work)
+            if not safe:
+                return False, []
+            safe_seq.extend(remain[rest].tolist())
+            break
+        rounds += 1
+        if remain.size * 8 >= n:
+            # 剩余进程较多时直接在整个矩阵上比较、求和，避免按索引取行产生副本
+            ready = np.all(need <= work, axis=1) & ~finish
+            done = np.flatnonzero(ready)
+            released = ready.astype(alloc.dtype) @ alloc
+        else:
+            done = remain[np.all(need[remain] <= work, axis=1)]
+            released = alloc[done].sum(axis=0)
+        if done.size == 0:
+            return False, []
+        work += released
+        finish[done] = True
+        safe_seq.extend(done.tolist())
+        remain = remain[~finish[remain]]
+
+    return True, safe_seq
+
+
+def _safety_sorted(alloc: np.ndarray, need: np.ndarray,
+                   available: np.ndarray) -> (bool, List):
+    """基于各资源有序索引的安全性检查"""
+    n, m = need.shape
+    if n == 0:
+        return True, []
+
+    order = np.argsort(need, axis=0, kind="stable")
+    sorted_need = np.take_along_axis(need, order, axis=0).astype(np.int64)
+    # 各列加上偏移后拼成一个整体有序的数组，一次searchsorted即可定位所有列
+    span = int(max(sorted_need.max(), 0)) + 1
+    offsets = np.arange(m, dtype=np.int64) * span
+    flat = (sorted_need + offsets).T.ravel()
+    starts = np.arange(m) * n
+
+    work = available.astype(np.int64)
+    ptr = np.zeros(m, dtype=np.int64)
+    satisfied = np.zeros(n, dtype=np.int64)  # 每个进程已满足的资源种数
+    finish = np.zeros(n, dtype=bool)
     safe_seq = []
 
     while True:
-        found = False
-        for i in range(alloc.shape[0]):
-            if not finish[i] and np.all(need_test[i] <= work):
-                work += alloc_test[i]
-                finish[i] = True
-                safe_seq.append(i)
-                found = True
-                break
-        if not found:
+        limit = np.clip(work, -1, span - 1) + offsets
+        new_ptr = np.searchsorted(flat, limit, side="right") - starts
+        lengths = new_ptr - ptr
+        total = int(lengths.sum())
+        if total == 0:
+            break
+        # 取出本轮新满足的(进程, 资源)对
+        cols = np.repeat(np.arange(m), lengths)
+        rows = ptr[cols] + np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        passed = order[rows, cols]
+        np.add.at(satisfied, passed, 1)
+        ptr = new_ptr
+
+        ready = np.unique(passed[satisfied[passed] == m])
+        ready = ready[~finish[ready]]
+        if ready.size == 0:
             break
+        finish[ready] = True
+        work += alloc[ready].sum(axis=0)
+        safe_seq.extend(ready.tolist())
 
-    if np.all(finish):
+    if len(safe_seq) == n:
         return True, safe_seq
-    else:
-        return False, []
+    return False, []
+
+
+class _Timeout(Exception):
+    """精确搜索超出时间预算"""
+
+
+def interchangeable_classes(alloc: np.ndarray, need: np.ndarray) -> np.ndarray:
+    """按(Alloc, Need)行划分可互换进程，返回每个进程的类别编号"""
+    if alloc.shape[0] == 0:
+        return np.zeros(0, dtype=int)
+    rows = np.concatenate([alloc, need], axis=1)
+    _, labels = np.unique(rows, axis=0, return_inverse=True)
+    return labels.reshape(-1)
+
+
+def count_safe_sequences(alloc: np.ndarray, need: np.ndarray, available: np.ndarray,
+                         exact_max_n: int = 20, samples: int = 200,
+                         seed=None, time_budget: Optional[float] = 0.02) -> (int, bool):
+    """统计安全序列个数，返回(个数, 是否精确)
+
+    work只取决于已完成进程的集合，按可互换进程类别的完成计数做记忆化；
+    记忆化的状态数最坏为2^n，进程数超过exact_max_n或精确计数超出time_budget秒时
+    改用随机游走（Knuth估计）给出近似值。
+    """
+    n = alloc.shape[0]
+    if n == 0:
+        return 1, True
+    if not safety_check(alloc, need, available.copy())[0]:
+        return 0, True
+
+    labels = interchangeable_classes(alloc, need)
+    sizes = np.bincount(labels)
+    first = np.array([np.flatnonzero(labels == c)[0] for c in range(len(sizes))])
+    class_alloc = alloc[first]
+    class_need = need[first]
+
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    if n <= exact_max_n:
+        memo = {}
+
+        def count(done: tuple, work: np.ndarray) -> int:
+            if done in memo:
+                return memo[done]
+            if deadline is not None and time.perf_counter() > deadline:
+                raise _Timeout
+            remain = sizes - np.array(done)
+            runnable = (remain > 0) & np.all(class_need <= work, axis=1)
+            left = int(remain.sum())
+            if np.array_equal(runnable, remain > 0):
+                # 剩余进程都已可执行，之后work只增不减，任意顺序都安全
+                total = math.factorial(left)
+            else:
+                total = 0
+                for c in np.flatnonzero(runnable):
+                    nxt = list(done)
+                    nxt[c] += 1
+                    total += int(remain[c]) * count(tuple(nxt), work + class_alloc[c])
+            memo[done] = total
+            return total
+
+        try:
+            return count(tuple([0] * len(sizes)), available.copy()), True
+        except _Timeout:
+            pass
+
+    # 安全状态下不会走入死路，各步分支数之积是序列总数的无偏估计；
+    # 全部随机游走同时推进，估计值可能超出int64，以Python整数累乘
+    rng = np.random.default_rng(seed)
+    work = np.tile(available.astype(np.int64), (samples, 1))
+    remain = np.tile(sizes, (samples, 1))
+    estimates = np.ones(samples, dtype=object)
+    walking = np.arange(samples)
+    while walking.size:
+        left = remain[walking] > 0
+        runnable = left & np.all(class_need <= work[walking][:, None, :], axis=2)
+        # 剩余进程都已可执行的游走乘以剩余进程数的阶乘后结束
+        finished = (runnable == left).all(axis=1)
+        for k in walking[finished]:
+            estimates[k] *= math.factorial(int(remain[k].sum()))
+        walking, runnable = walking[~finished], runnable[~finished]
+        if not walking.size:
+            break
+        weights = remain[walking] * runnable
+        cumulative = weights.cumsum(axis=1)
+        branches = cumulative[:, -1]
+        c = (cumulative <= rng.random(walking.size)[:, None] * branches[:, None]).sum(axis=1)
+        estimates[walking] *= branches.astype(object)
+        remain[walking, c] -= 1
+        work[walking] += class_alloc[c]
+    return (int(estimates.sum()) + samples // 2) // samples, False
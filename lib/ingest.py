@@ -0,0 +1,306 @@
+# lib/ingest.py
+import argparse
+import io
+import json
+import os
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# 每种违规最多列出的位置数
+MAX_REPORT = 10
+# 请求文件的违规类别
+REQUEST_CHECKS = ("进程号越界", "请求量为负")
+
+# 文件格式：
+#   状态CSV：每行一个进程，依次为max_0..max_{m-1}, alloc_0..alloc_{m-1}，可有表头；
+#   状态JSONL：每行{"max": [...], "alloc": [...]}，另可有一行{"sys_resource": [...]}；
+#   请求CSV：每行pid, req_0..req_{m-1}，可有表头；
+#   请求JSONL：每行{"pid": p, "request": [...]}。
+
+
+class ValidationError(ValueError):
+    """输入数据不满足约束，violations为全部违规项的说明"""
+
+    def __init__(self, violations: List[str]):
+        self.violations = violations
+        super().__init__("；".join(violations))
+
+
+def parse_vector(text: str, what: str = "系统资源") -> List[int]:
+    """解析逗号分隔的整数向量（如命令行的--sys），格式错误时抛出ValidationError"""
+    try:
+        return [int(x) for x in text.split(",")]
+    except ValueError:
+        raise ValidationError([f"{what}应为逗号分隔的整数：{text}"]) from None
+
+
+def _open_text(file):
+    """路径、文本或二进制文件对象统一为按行迭代的文本流"""
+    if isinstance(file, (str, os.PathLike)):
+        return open(file, encoding="utf-8")
+    if isinstance(file, io.TextIOBase):
+        return file
+    return io.TextIOWrapper(file, encoding="utf-8")
+
+
+def _is_jsonl(file, fmt: Optional[str]) -> bool:
+    """按fmt或文件名后缀判断格式，默认为CSV"""
+    if fmt is not None:
+        return fmt == "jsonl"
+    name = str(getattr(file, "name", file))
+    return name.endswith((".jsonl", ".ndjson"))
+
+
+def _read_chunks(file, chunk_size: int) -> Iterator[Tuple[int, List[str]]]:
+    """逐块读取非空行，产出(块首行行号, 行列表)"""
+    stream = _open_text(file)
+    line_no = 1
+    while True:
+        try:
+            lines = list(islice(stream, chunk_size))
+        except UnicodeDecodeError:
+            raise ValidationError([f"第{line_no}行起的内容不是UTF-8文本"]) from None
+        if not lines:
+            return
+        yield line_no, [line for line in lines if line.strip()]
+        line_no += len(lines)
+
+
+def _parse_csv(lines: List[str], start: int, header: bool) -> Optional[np.ndarray]:
+    """把一块CSV行解析为整数矩阵，header为True时跳过首个含字母的行；没有数据时返回None"""
+    if header and lines and any(c.isalpha() for c in lines[0]):
+        lines = lines[1:]
+    if not lines:
+        return None
+    try:
+        return np.loadtxt(lines, delimiter=",", dtype=np.int64, ndmin=2)
+    except ValueError as e:
+        raise ValidationError([f"第{start}行起的数据块格式错误：{e}"]) from None
+
+
+def _parse_json(lines: List[str], start: int) -> List[dict]:
+    """把一块JSONL行解析为字典列表"""
+    try:
+        rows = [json.loads(line) for line in lines]
+    except json.JSONDecodeError as e:
+        raise ValidationError([f"第{start}行起的数据块JSON格式错误：{e}"]) from None
+    if not all(isinstance(row, dict) for row in rows):
+        raise ValidationError([f"第{start}行起的数据块中有不是JSON对象的行"])
+    return rows
+
+
+def _matrix(rows, width: Optional[int], what: str, start: int) -> np.ndarray:
+    """把若干等长列表转为整数矩阵，长度不一致时报错"""
+    try:
+        matrix = np.array(rows, dtype=np.int64).reshape(len(rows), -1)
+    except (ValueError, TypeError):
+        raise ValidationError([f"第{start}行起的数据块中{what}长度不一致"]) from None
+    if width is not None and len(rows) and matrix.shape[1] != width:
+        raise ValidationError([f"第{start}行起的数据块中{what}应有{width}项，实际为{matrix.shape[1]}项"])
+    return matrix
+
+
+def _describe(what: str, cells: np.ndarray, labels) -> Optional[str]:
+    """把违规位置列表汇总为一句说明，最多列出MAX_REPORT处"""
+    if len(cells) == 0:
+        return None
+    shown = "、".join(labels(cell) for cell in cells[:MAX_REPORT])
+    more = "等" if len(cells) > MAX_REPORT else ""
+    return f"{what}：共{len(cells)}处，{shown}{more}"
+
+
+def validate_state(sys_resource: np.ndarray, max_alloc: np.ndarray, alloc: np.ndarray) -> None:
+    """向量化检查系统状态的全部约束，有违规时一次性抛出ValidationError"""
+    violations = []
+    if max_alloc.shape != alloc.shape or max_alloc.shape[1:] != sys_resource.shape:
+        raise ValidationError([f"矩阵形状不一致：MAX {max_alloc.shape}，ALLOC {alloc.shape}，"
+                               f"系统资源 {sys_resource.shape}"])
+    checks = [
+        ("系统资源为负", np.flatnonzero(sys_resource < 0)[:, None],
+         lambda c: f"R{c[0]}={sys_resource[c[0]]}"),
+        ("最大需求为负", np.argwhere(max_alloc < 0),
+         lambda c: f"P{c[0]}-R{c[1]}={max_alloc[tuple(c)]}"),
+        ("已分配为负", np.argwhere(alloc < 0),
+         lambda c: f"P{c[0]}-R{c[1]}={alloc[tuple(c)]}"),
+        ("已分配超过最大需求", np.argwhere(alloc > max_alloc),
+         lambda c: f"P{c[0]}-R{c[1]}({alloc[tuple(c)]}>{max_alloc[tuple(c)]})"),
+        ("最大需求超过系统资源", np.argwhere(max_alloc > sys_resource),
+         lambda c: f"P{c[0]}-R{c[1]}({max_alloc[tuple(c)]}>{sys_resource[c[1]]})"),
+    ]
+    total = alloc.sum(axis=0)
+    checks.append(("已分配之和超过系统资源", np.flatnonzero(total > sys_resource)[:, None],
+                   lambda c: f"R{c[0]}({total[c[0]]}>{sys_resource[c[0]]})"))
+    for what, cells, labels in checks:
+        message = _describe(what, cells, labels)
+        if message:
+            violations.append(message)
+    if violations:
+        raise ValidationError(violations)
+
+
+def read_state(file, sys_resource=None, fmt: Optional[str] = None,
+               chunk_size: int = 65536) -> (np.ndarray, np.ndarray, np.ndarray):
+    """分块读取状态文件并校验，返回(系统资源, 最大需求矩阵, 已分配矩阵)
+
+    CSV文件须另行给出sys_resource；JSONL文件中的sys_resource行优先于参数。
+    """
+    jsonl = _is_jsonl(file, fmt)
+    max_parts, alloc_parts = [], []
+    m = None if sys_resource is None else len(sys_resource)
+    for start, lines in _read_chunks(file, chunk_size):
+        if jsonl:
+            rows = _parse_json(lines, start)
+            for row in rows:
+                if "sys_resource" in row:
+                    sys_resource = row["sys_resource"]
+                    if not isinstance(sys_resource, list):
+                        raise ValidationError([f"第{start}行起的数据块中sys_resource应为整数列表"])
+                    m = len(sys_resource)
+            rows = [row for row in rows if "sys_resource" not in row]
+            if not rows:
+                # 数据块中只有sys_resource行或空行
+                continue
+            try:
+                max_part = _matrix([row["max"] for row in rows], m, "max", start)
+                alloc_part = _matrix([row["alloc"] for row in rows], max_part.shape[1], "alloc", start)
+            except KeyError as e:
+                raise ValidationError([f"第{start}行起的数据块缺少字段{e}"]) from None
+        else:
+            block = _parse_csv(lines, start, header=start == 1)
+            if block is None:
+                continue
+            if block.shape[1] % 2:
+                raise ValidationError([f"第{start}行起的数据块列数为{block.shape[1]}，应为MAX与ALLOC各m列"])
+            max_part, alloc_part = np.hsplit(block, 2)
+            if m is not None and max_part.shape[1] != m:
+                raise ValidationError([f"第{start}行起的数据块列数为{block.shape[1]}，应为MAX与ALLOC各{m}列"])
+        if m is None and len(max_part):
+            m = max_part.shape[1]
+        max_parts.append(max_part)
+        alloc_parts.append(alloc_part)
+
+    if sys_resource is None:
+        raise ValidationError(["缺少系统资源向量"])
+    try:
+        sys_resource = np.asarray(sys_resource, dtype=np.int64).reshape(-1)
+    except (ValueError, TypeError):
+        raise ValidationError([f"系统资源应为整数列表：{sys_resource}"]) from None
+    m = len(sys_resource)
+    max_alloc = np.concatenate(max_parts) if max_parts else np.zeros((0, m), dtype=np.int64)
+    alloc = np.concatenate(alloc_parts) if alloc_parts else np.zeros((0, m), dtype=np.int64)
+    if len(max_alloc) == 0:
+        raise ValidationError(["状态文件中没有进程"])
+    validate_state(sys_resource, max_alloc, alloc)
+    return sys_resource.astype(np.int32), max_alloc.astype(np.int32), alloc.astype(np.int32)
+
+
+def _request_violations(pids: np.ndarray, reqs: np.ndarray, n: int,
+                        start: int) -> List[Tuple[int, List[str]]]:
+    """一块请求中各类违规的(处数, 前MAX_REPORT处的位置)，顺序与REQUEST_CHECKS一致"""
+    bad_pids = np.flatnonzero((pids < 0) | (pids >= n))
+    bad_reqs = np.argwhere(reqs < 0)
+    return [
+        (len(bad_pids), [f"#{start + i}(P{pids[i]})" for i in bad_pids[:MAX_REPORT]]),
+        (len(bad_reqs), [f"#{start + i}-R{j}={reqs[i, j]}" for i, j in bad_reqs[:MAX_REPORT]]),
+    ]
+
+
+def _request_report(found: List[Tuple[int, List[str]]]) -> List[str]:
+    """把各类请求违规汇总为说明列表"""
+    violations = []
+    for what, (count, shown) in zip(REQUEST_CHECKS, found):
+        if count:
+            more = "等" if count > len(shown) else ""
+            violations.append(f"{what}：共{count}处，{'、'.join(shown)}{more}")
+    return violations
+
+
+def validate_requests(pids: np.ndarray, reqs: np.ndarray, n: int, m: int, start: int = 0) -> None:
+    """向量化检查一块请求的进程号与请求量，有违规时一次性抛出ValidationError
+
+    start为该块第一个请求的序号，用于报告位置。
+    """
+    if reqs.shape[1:] != (m,):
+        raise ValidationError([f"请求应有{m}种资源，实际为{reqs.shape[1] if reqs.ndim == 2 else 0}种"])
+    violations = _request_report(_request_violations(pids, reqs, n, start))
+    if violations:
+        raise ValidationError(violations)
+
+
+def iter_requests(file, n: int, m: int, fmt: Optional[str] = None,
+                  chunk_size: int = 65536) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """分块读取并校验请求文件，产出(进程号向量, 请求矩阵)，可直接交给lib.scenario.save_scenario
+
+    各块的违规项按类别累计，读完文件时一次性抛出。
+    """
+    found = [(0, []) for _ in REQUEST_CHECKS]
+    count = 0
+    for start, lines in _read_chunks(file, chunk_size):
+        if _is_jsonl(file, fmt):
+            rows = _parse_json(lines, start)
+            if not rows:
+                continue
+            try:
+                pids = np.array([row["pid"] for row in rows], dtype=np.int64)
+                reqs = _matrix([row["request"] for row in rows], m, "request", start)
+            except KeyError as e:
+                raise ValidationError([f"第{start}行起的数据块缺少字段{e}"]) from None
+            except (ValueError, TypeError):
+                raise ValidationError([f"第{start}行起的数据块中pid不是整数"]) from None
+        else:
+            block = _parse_csv(lines, start, header=start == 1)
+            if block is None:
+                continue
+            if block.shape[1] != m + 1:
+                raise ValidationError([f"第{start}行起的数据块列数为{block.shape[1]}，应为pid与{m}种资源"])
+            pids, reqs = block[:, 0], block[:, 1:]
+        chunk = _request_violations(pids, reqs, n, count)
+        found = [(total + k, (shown + more)[:MAX_REPORT])
+                 for (total, shown), (k, more) in zip(found, chunk)]
+        if not any(k for k, _ in chunk):
+            yield pids.astype(np.int32), reqs.astype(np.int32)
+        count += len(pids)
+    violations = _request_report(found)
+    if violations:
+        raise ValidationError(violations)
+
+
+def read_requests(file, n: int, m: int, fmt: Optional[str] = None,
+                  chunk_size: int = 65536) -> (np.ndarray, np.ndarray):
+    """读取整个请求文件，返回(进程号向量, R×m请求矩阵)"""
+    parts = list(iter_requests(file, n, m, fmt, chunk_size))
+    if not parts:
+        return np.zeros(0, dtype=np.int32), np.zeros((0, m), dtype=np.int32)
+    pids, reqs = zip(*parts)
+    return np.concatenate(pids), np.concatenate(reqs)
+
+
+def main(argv=None):
+    """把CSV/JSONL状态与请求文件转换为场景文件"""
+    from lib.scenario import save_scenario
+
+    parser = argparse.ArgumentParser(prog="python -m lib.ingest", description=main.__doc__)
+    parser.add_argument("state", help="状态文件（.csv或.jsonl）")
+    parser.add_argument("requests", help="请求文件（.csv或.jsonl）")
+    parser.add_argument("-o", "--output", required=True, help="输出的场景文件")
+    parser.add_argument("--sys", help="系统资源，逗号分隔（CSV状态文件必需）")
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    args = parser.parse_args(argv)
+
+    try:
+        sys_resource = parse_vector(args.sys) if args.sys else None
+        sys_resource, max_alloc, alloc = read_state(args.state, sys_resource, chunk_size=args.chunk_size)
+        n, m = alloc.shape
+        count = save_scenario(args.output, sys_resource, max_alloc, alloc,
+                              iter_requests(args.requests, n, m, chunk_size=args.chunk_size))
+    except ValidationError as e:
+        if os.path.exists(args.output):
+            os.remove(args.output)
+        parser.exit(1, "\n".join(e.violations) + "\n")
+    print(f"{n}个进程、{m}种资源、{count}个请求 -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# lib/metrics.py
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict
+
+
+class Metrics:
+    """轻量的计时与计数钩子
+
+    timer(stage)记录各阶段的调用次数、累计/最近/最长耗时，inc(name)累加计数器；
+    可导出为Prometheus文本格式。
+    """
+
+    def __init__(self, prefix: str = "banker"):
+        self.prefix = prefix
+        self.counters = defaultdict(int)
+        self.timers = {}  # 阶段 -> [次数, 累计秒数, 最近秒数, 最长秒数]
+
+    def inc(self, name: str, value=1):
+        """累加计数器"""
+        self.counters[name] += value
+
+    def observe(self, stage: str, seconds: float):
+        """记录一次阶段耗时"""
+        stat = self.timers.setdefault(stage, [0, 0.0, 0.0, 0.0])
+        stat[0] += 1
+        stat[1] += seconds
+        stat[2] = seconds
+        stat[3] = max(stat[3], seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """对with块计时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def reset(self):
+        self.counters.clear()
+        self.timers.clear()
+
+    def snapshot(self) -> Dict:
+        """当前指标的字典形式，耗时单位为毫秒"""
+        return {
+            "timers": {
+                stage: {"count": count, "total_ms": total * 1e3, "last_ms": last * 1e3,
+                        "max_ms": longest * 1e3, "mean_ms": total * 1e3 / count}
+                for stage, (count, total, last, longest) in self.timers.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def to_prometheus(self) -> str:
+        """导出为Prometheus文本格式：阶段耗时为summary（另附最长耗时gauge），计数器为counter"""
+        lines = []
+        if self.timers:
+            name = f"{self.prefix}_stage_seconds"
+            lines += [f"# HELP {name} 各阶段耗时（秒）", f"# TYPE {name} summary"]
+            for stage, (count, total, _, _) in sorted(self.timers.items()):
+                lines.append(f'{name}_sum{{stage="{stage}"}} {total:.9g}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+            lines += [f"# HELP {name}_max 各阶段最长耗时（秒）", f"# TYPE {name}_max gauge"]
+            for stage, (_, _, _, longest) in sorted(self.timers.items()):
+                lines.append(f'{name}_max{{stage="{stage}"}} {longest:.9g}')
+        for counter, value in sorted(self.counters.items()):
+            name = f"{self.prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', counter)}_total"
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
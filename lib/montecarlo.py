@@ -0,0 +1,310 @@
+# lib/montecarlo.py
+"""蒙特卡洛模拟：python -m lib.montecarlo
+
+一次生成B个随机系统，堆叠为(B, n, m)的张量，安全性检查与请求准入都沿B维批量进行；
+B较大时按分片交给进程池，每个分片的种子由SeedSequence派生，结果与进程数无关。
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+
+from lib.core import (GRANTED, DENIED_NEED, DENIED_AVAILABLE, DENIED_UNSAFE,
+                      _splitneed, count_safe_sequences)
+
+DEFAULT_SHARD_SIZE = 1024
+# 输出分布的分位点
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+# 超额分配的系统比例达到该值时给出警告
+OVERCOMMIT_WARNING = 0.99
+# 获批请求的比例低于该值时给出警告
+GRANT_WARNING = 0.01
+
+
+def batch_systems(batch: int, n: int, m: int, maxnum: int = 20, lowestnum: int = 5,
+                  seed=None, generator: str = "safe") -> (np.ndarray, np.ndarray, np.ndarray):
+    """批量生成(系统总资源(B, m), 最大需求(B, n, m), 已分配(B, n, m))
+
+    generator="safe"：与initsafeconfig的分布相同，初始状态安全，请求的判定结果各类都有；
+    generator="independent"：与initsysresource/initmaxalloc/initalloc的分布相同，已分配之和可能超过系统资源；
+    generator="config"：与initconfig的分布相同，已分配逐行从剩余资源中抽取，之和不超过系统资源，
+    但前几个进程几乎取走全部资源，请求大多因可用资源不足被拒绝。
+    """
+    rng = np.random.default_rng(seed)
+    if generator == "safe":
+        alloc = rng.integers(0, lowestnum + 1, size=(batch, n, m), dtype=np.int32)
+        available = rng.integers(lowestnum, maxnum + 1, size=(batch, m), dtype=np.int32)
+        # 各系统一个随机顺序，需求不超过该顺序下前面的进程全部完成后的work
+        order = np.argsort(rng.random((batch, n)), axis=1)[:, :, None]
+        rows = np.take_along_axis(alloc, order, axis=1)
+        work = rows.cumsum(axis=1, dtype=np.int32)
+        work -= rows
+        work += available[:, None, :]
+        np.minimum(work, maxnum, out=work)
+        need = np.empty_like(alloc)
+        np.put_along_axis(need, order, (rng.random((batch, n, m)) * (work + 1)).astype(np.int32), axis=1)
+        return available + alloc.sum(axis=1, dtype=np.int32), alloc + need, alloc
+    if generator == "independent":
+        sys_resource = rng.integers(lowestnum, maxnum, size=(batch, m), dtype=np.int32)
+        max_alloc = rng.integers(0, sys_resource[:, None, :] + 1, size=(batch, n, m), dtype=np.int32)
+        alloc = rng.integers(0, max_alloc + 1, dtype=np.int32)
+        return sys_resource, max_alloc, alloc
+    if generator != "config":
+        raise ValueError(f"未知的生成方式: {generator}")
+
+    sys_resource = np.maximum(rng.integers(0, maxnum + 1, size=(batch, m)), lowestnum).astype(np.int32)
+    alloc = np.zeros((batch, n, m), dtype=np.int32)
+    remain = sys_resource.copy()
+    for i in range(n):
+        if not remain.any():
+            break
+        alloc[:, i] = rng.integers(0, remain + 1)
+        remain -= alloc[:, i]
+    u = rng.random((batch, n, m), dtype=np.float32)
+    u *= sys_resource[:, None, :] - alloc + 1
+    max_alloc = alloc + u.astype(np.int32)
+    np.minimum(max_alloc, sys_resource[:, None, :], out=max_alloc)
+    return sys_resource, max_alloc, alloc
+
+
+def batch_safety(alloc: np.ndarray, need: np.ndarray, available: np.ndarray) -> (np.ndarray, np.ndarray):
+    """对B个系统同时做安全性检查，返回(是否安全(B,), 推进轮数(B,))
+
+    与safety_check(method="batched")相同，每轮释放所有可执行进程；
+    各系统的轮数不同，全部系统都不再推进时结束。
+    """
+    batch, n, _ = alloc.shape
+    work = available.astype(np.int64)
+    finish = np.zeros((batch, n), dtype=bool)
+    rounds = np.zeros(batch, dtype=np.int32)
+    while True:
+        ready = np.all(need <= work[:, None, :], axis=2) & ~finish
+        progress = ready.any(axis=1)
+        if not progress.any():
+            break
+        rounds += progress
+        finish |= ready
+        work += np.einsum("bn,bnm->bm", ready.astype(np.int64), alloc)
+    return finish.all(axis=1), rounds
+
+
+def batch_reqs(need: np.ndarray, rng: np.random.Generator) -> (np.ndarray, np.ndarray, np.ndarray):
+    """为B个系统生成请求序列，返回(进程号(B, L), 请求(B, L, m), 有效标记(B, L))
+
+    按initreqs的方式拆分需求并在各系统内打乱；各系统的请求数不同，短的在末尾补无效请求。
+    """
+    batch, n, m = need.shape
+    pids, reqs = _splitneed(need.reshape(batch * n, m), rng)
+    system = pids // max(n, 1)
+    # 以系统号为主键、随机数为次键排序，即各系统内独立打乱
+    order = np.lexsort((rng.random(len(pids)), system))
+    pids, reqs, system = pids[order] % max(n, 1), reqs[order], system[order]
+
+    counts = np.bincount(system, minlength=batch)
+    length = int(counts.max()) if batch else 0
+    column = np.arange(len(pids)) - np.repeat(np.cumsum(counts) - counts, counts)
+    out_pids = np.zeros((batch, length), dtype=np.int32)
+    out_reqs = np.zeros((batch, length, m), dtype=need.dtype)
+    valid = np.zeros((batch, length), dtype=bool)
+    out_pids[system, column] = pids
+    out_reqs[system, column] = reqs
+    valid[system, column] = True
+    return out_pids, out_reqs, valid
+
+
+def batch_admission(alloc: np.ndarray, need: np.ndarray, available: np.ndarray,
+                    pids: np.ndarray, reqs: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """B个系统同时按顺序处理各自的请求序列，原地修改状态，返回判定结果(B, L)
+
+    每一步各系统处理一个请求，判定规则与lib.core.admit相同；
+    只有通过需求与可用资源检查的系统才做一次批量安全性检查。无效请求的结果为-1。
+    """
+    batch = alloc.shape[0]
+    rows = np.arange(batch)
+    codes = np.full(pids.shape, -1, dtype=np.int8)
+    for t in range(pids.shape[1]):
+        pid, req = pids[:, t], reqs[:, t]
+        code = np.full(batch, GRANTED, dtype=np.int8)
+        code[(req > need[rows, pid]).any(axis=1)] = DENIED_NEED
+        code[(code == GRANTED) & (req > available).any(axis=1)] = DENIED_AVAILABLE
+
+        # 试分配后对涉及的系统做安全性检查，不安全的回滚
+        trial = rows[valid[:, t] & (code == GRANTED)]
+        p, r = pid[trial], req[trial]
+        alloc[trial, p] += r
+        need[trial, p] -= r
+        available[trial] -= r
+        safe, _ = batch_safety(alloc[trial], need[trial], available[trial])
+        unsafe, p, r = trial[~safe], p[~safe], r[~safe]
+        alloc[unsafe, p] -= r
+        need[unsafe, p] += r
+        available[unsafe] += r
+        code[unsafe] = DENIED_UNSAFE
+
+        # 进程需求满足后释放资源
+        granted = trial[safe]
+        p = pid[granted]
+        done = granted[~need[granted, p].any(axis=1)]
+        p = pid[done]
+        available[done] += alloc[done, p]
+        alloc[done, p] = 0
+
+        codes[:, t] = np.where(valid[:, t], code, -1)
+    return codes
+
+
+def simulate_shard(batch: int, n: int, m: int, maxnum: int = 20, lowestnum: int = 5,
+                   seed=None, generator: str = "safe", count: bool = False) -> Dict[str, np.ndarray]:
+    """模拟一个分片的B个系统，返回各系统的统计量数组"""
+    rng = np.random.default_rng(seed)
+    sys_resource, max_alloc, alloc = batch_systems(batch, n, m, maxnum, lowestnum, rng, generator)
+    need = max_alloc - alloc
+    available = sys_resource - alloc.sum(axis=1, dtype=np.int32)
+
+    safe, rounds = batch_safety(alloc, need, available)
+    result = {
+        "safe": safe,
+        "rounds": rounds,
+        "overcommitted": (available < 0).any(axis=1),
+    }
+    if count:
+        result["sequences"] = np.array([
+            count_safe_sequences(alloc[b], need[b], available[b], seed=rng)[0] if safe[b] else 0
+            for b in range(batch)
+        ], dtype=np.float64)
+
+    pids, reqs, valid = batch_reqs(need, rng)
+    codes = batch_admission(alloc, need, available, pids, reqs, valid)
+    result["requests"] = valid.sum(axis=1)
+    for name, code in (("granted", GRANTED), ("denied_need", DENIED_NEED),
+                       ("denied_available", DENIED_AVAILABLE), ("denied_unsafe", DENIED_UNSAFE)):
+        result[name] = (codes == code).sum(axis=1)
+    result["final_safe"] = batch_safety(alloc, need, available)[0]
+    return result
+
+
+def _shard_sizes(batch: int, shard_size: int):
+    """把B个系统按shard_size划分"""
+    return [min(shard_size, batch - start) for start in range(0, batch, shard_size)]
+
+
+def run(batch: int, n: int, m: int, maxnum: int = 20, lowestnum: int = 5, seed=None,
+        generator: str = "safe", count: bool = False,
+        shard_size: int = DEFAULT_SHARD_SIZE, workers: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """模拟B个系统，返回按系统拼接的统计量数组
+
+    workers=1时在当前进程内依次计算各分片，否则交给ProcessPoolExecutor（None为CPU核数）。
+    """
+    sizes = _shard_sizes(batch, shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(size, n, m, maxnum, lowestnum, s, generator, count) for size, s in zip(sizes, seeds)]
+    if workers == 1 or len(args) <= 1:
+        shards = [simulate_shard(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shards = list(pool.map(simulate_shard, *zip(*args)))
+    if not shards:
+        return {}
+    return {key: np.concatenate([s[key] for s in shards]) for key in shards[0]}
+
+
+def distribution(values: np.ndarray) -> Dict:
+    """均值、标准差与分位数"""
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return {"mean": None}
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "quantiles": {f"p{round(q * 100)}": float(v) for q, v in zip(QUANTILES, np.quantile(values, QUANTILES))},
+    }
+
+
+def summarize(result: Dict[str, np.ndarray], shard_size: int = DEFAULT_SHARD_SIZE) -> Dict:
+    """汇总为安全率、拒绝率与安全序列个数的分布
+
+    安全率给出整体比例、95%正态近似置信区间及各分片安全率的分布。
+    """
+    batch = len(result.get("safe", ()))
+    summary = {"systems": batch}
+    if not batch:
+        return summary
+
+    safe = result["safe"]
+    rate = float(safe.mean())
+    half = 1.96 * np.sqrt(rate * (1 - rate) / batch)
+    shard_rates = [chunk.mean() for chunk in np.array_split(safe, len(_shard_sizes(batch, shard_size)))]
+    summary["safety_rate"] = {"mean": rate, "ci95": [max(rate - half, 0.0), min(rate + half, 1.0)],
+                              "shards": distribution(shard_rates)}
+    summary["overcommitted_rate"] = float(result["overcommitted"].mean())
+    summary["final_safety_rate"] = float(result["final_safe"].mean())
+    summary["safety_rounds"] = distribution(result["rounds"][safe])
+
+    requests = result["requests"]
+    denied = requests - result["granted"]
+    has_requests = requests > 0
+    summary["requests"] = distribution(requests)
+    summary["denial_rate"] = distribution(denied[has_requests] / requests[has_requests])
+    totals = {key: int(result[key].sum()) for key in
+              ("granted", "denied_need", "denied_available", "denied_unsafe")}
+    summary["denials"] = {key: value / max(int(requests.sum()), 1) for key, value in totals.items()}
+    summary["denial_rate_by_safety"] = {
+        label: distribution(denied[mask] / requests[mask])
+        for label, mask in (("safe", safe & has_requests), ("unsafe", ~safe & has_requests))
+    }
+    if "sequences" in result:
+        summary["safe_sequences"] = distribution(result["sequences"][safe])
+
+    # 生成的系统没有可比较的差异时，分布本身没有意义
+    warnings = []
+    if summary["overcommitted_rate"] >= OVERCOMMIT_WARNING:
+        warnings.append(f"{summary['overcommitted_rate']:.2%}的系统已分配之和超过系统资源，"
+                        f"安全率与拒绝率主要反映生成方式；可改用generator=\"safe\"或减少进程数")
+    if summary["denials"]["granted"] < GRANT_WARNING:
+        warnings.append(f"只有{summary['denials']['granted']:.2%}的请求获得分配，生成的系统几乎没有可用资源")
+    if warnings:
+        summary["warnings"] = warnings
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m lib.montecarlo", description="随机系统的蒙特卡洛模拟")
+    parser.add_argument("-B", "--batch", type=int, default=10000, help="系统个数")
+    parser.add_argument("-n", type=int, default=10, help="进程数")
+    parser.add_argument("-m", type=int, default=3, help="资源种类数")
+    parser.add_argument("--maxnum", type=int, default=20, help="系统资源上限")
+    parser.add_argument("--lowest", type=int, default=5, help="系统资源下限")
+    parser.add_argument("--generator", choices=("safe", "config", "independent"), default="safe",
+                        help="safe：与initsafeconfig相同，初始状态安全，需求不超过按某一顺序完成时的可用资源；"
+                             "config：initconfig逐行从剩余资源中抽取，前几个进程几乎取走全部资源，请求大多被拒绝；"
+                             "independent：initsysresource/initmaxalloc/initalloc逐项独立生成，"
+                             "进程数稍多时几乎全部超额分配")
+    parser.add_argument("--count", action="store_true", help="统计安全系统的安全序列个数")
+    parser.add_argument("--seed", type=int, help="随机种子")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="每个分片的系统数")
+    parser.add_argument("--workers", type=int, help="进程数，1为单进程，缺省为CPU核数")
+    parser.add_argument("--indent", type=int, help="JSON缩进")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    result = run(args.batch, args.n, args.m, args.maxnum, args.lowest, args.seed, args.generator,
+                 args.count, args.shard_size, args.workers)
+    seconds = time.perf_counter() - start
+    summary = {"n": args.n, "m": args.m, "generator": args.generator, "seed": args.seed}
+    summary.update(summarize(result, args.shard_size))
+    summary["seconds"] = seconds
+    summary["systems_per_sec"] = args.batch / seconds if seconds > 0 else None
+    for warning in summary.get("warnings", ()):
+        print(f"警告：{warning}", file=sys.stderr)
+    print(json.dumps(summary, ensure_ascii=False, indent=args.indent))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# lib/scenario.py
+import shutil
+import tempfile
+import numpy as np
+from typing import BinaryIO, Dict, Iterable, Tuple, Union
+
+from lib.core import (GRANTED, DENIED_NEED, DENIED_AVAILABLE, DENIED_UNSAFE,
+                      calneed, process_requests, refreshavailable)
+from lib.ingest import ValidationError, validate_requests, validate_state
+
+# 场景文件：定长文件头之后依次为系统资源(m)、最大需求(n×m)、已分配(n×m)、
+# 请求矩阵(R×m)与进程号(R)，均为小端int32、按行连续存放，可直接内存映射
+MAGIC = b"BANKSCN1"
+VERSION = 1
+HEADER = np.dtype([("magic", "S8"), ("version", "<u4"), ("n", "<u4"),
+                   ("m", "<u4"), ("reserved", "<u4"), ("count", "<u8")])
+ITEM = np.dtype("<i4")
+# 载入时逐块校验请求序列的行数
+CHECK_CHUNK = 1 << 20
+
+
+def save_scenario(file: Union[str, BinaryIO], sys_resource, max_alloc, alloc,
+                  chunks: Iterable[Tuple[np.ndarray, np.ndarray]]) -> int:
+    """把场景写入文件，返回请求数
+
+    chunks为(进程号向量, 请求矩阵)的可迭代对象（如lib.core.iterreqs），逐块写入，
+    进程号先暂存到临时文件，写完请求矩阵后接在其后，内存占用与块大小成正比。
+    file为路径或可seek的二进制文件对象。
+    """
+    if isinstance(file, str):
+        with open(file, "wb") as f:
+            return save_scenario(f, sys_resource, max_alloc, alloc, chunks)
+
+    alloc = np.asarray(alloc, dtype=ITEM)
+    n, m = alloc.shape
+    start = file.tell()
+    header = np.zeros(1, dtype=HEADER)
+    header[0] = (MAGIC, VERSION, n, m, 0, 0)
+    file.write(header.tobytes())
+    file.write(np.asarray(sys_resource, dtype=ITEM).tobytes())
+    file.write(np.asarray(max_alloc, dtype=ITEM).reshape(n, m).tobytes())
+    file.write(alloc.tobytes())
+
+    count = 0
+    with tempfile.TemporaryFile() as spool:
+        for pids, reqs in chunks:
+            file.write(np.ascontiguousarray(reqs, dtype=ITEM).reshape(-1, m).tobytes())
+            spool.write(np.asarray(pids, dtype=ITEM).tobytes())
+            count += len(pids)
+        spool.seek(0)
+        shutil.copyfileobj(spool, file)
+
+    # 回填请求数
+    end = file.tell()
+    header[0]["count"] = count
+    file.seek(start)
+    file.write(header.tobytes())
+    file.seek(end)
+    return count
+
+
+def load_scenario(source: Union[str, bytes, bytearray, memoryview]) -> Dict:
+    """读取场景，返回与lib.core.initstate相同结构的状态字典
+
+    source为路径时按内存映射打开，pids/reqs是只读的np.memmap视图，按需从磁盘读入；
+    为bytes时直接引用该缓冲区。系统资源与矩阵复制到内存，可原地修改。
+    状态与请求序列按lib.ingest的规则校验，文件损坏或不满足约束时抛出ValidationError。
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        raw = np.frombuffer(source, dtype=np.uint8)
+    else:
+        raw = np.memmap(source, dtype=np.uint8, mode="r")
+    if raw.size < HEADER.itemsize:
+        raise ValidationError(["场景文件不完整"])
+    header = raw[:HEADER.itemsize].view(HEADER)[0]
+    if header["magic"] != MAGIC:
+        raise ValidationError(["不是场景文件"])
+    if header["version"] != VERSION:
+        raise ValidationError([f"不支持的场景文件版本: {header['version']}"])
+    n, m, count = int(header["n"]), int(header["m"]), int(header["count"])
+    sizes = [m, n * m, n * m, count * m, count]
+    if raw.size < HEADER.itemsize + sum(sizes) * ITEM.itemsize:
+        raise ValidationError(["场景文件不完整"])
+
+    parts = []
+    offset = HEADER.itemsize
+    for size in sizes:
+        end = offset + size * ITEM.itemsize
+        parts.append(raw[offset:end].view(ITEM))
+        offset = end
+    sys_part, max_part, alloc_part, reqs, pids = parts
+
+    sys_resource = sys_part.astype(np.int32)
+    max_alloc = max_part.reshape(n, m).astype(np.int32)
+    alloc = alloc_part.reshape(n, m).astype(np.int32)
+    validate_state(sys_resource, max_alloc, alloc)
+    reqs = reqs.reshape(count, m)
+    # 请求序列可能很大，逐块检查进程号与请求量，不整体读入内存
+    for start in range(0, count, CHECK_CHUNK):
+        validate_requests(pids[start:start + CHECK_CHUNK], reqs[start:start + CHECK_CHUNK], n, m, start)
+    return {
+        "sys_resource": sys_resource,
+        "max_alloc": max_alloc,
+        "alloc": alloc,
+        "need": calneed(max_alloc, alloc),
+        "available": refreshavailable(n, m, sys_resource, alloc).astype(np.int32),
+        "pids": pids,
+        "reqs": reqs,
+    }
+
+
+def replay_scenario(state: Dict, chunk_size: int = 65536, method: str = "auto") -> Dict:
+    """按lib.core.admit的判定逐块回放场景中的请求序列，返回各判定结果的计数
+
+    每次只取出chunk_size个请求，内存映射的请求序列不会整体读入内存；
+    method为安全检查方法，见lib.core.safety_check。
+    """
+    pids, reqs = state["pids"], state["reqs"]
+    counts = np.zeros(4, dtype=np.int64)
+    released = 0
+    for start in range(0, len(pids), chunk_size):
+        codes, freed = process_requests(state, np.asarray(reqs[start:start + chunk_size]),
+                                        np.asarray(pids[start:start + chunk_size]), method)
+        counts += np.bincount(codes, minlength=4)
+        released += int(freed.sum())
+    return {
+        "requests": len(pids),
+        "granted": int(counts[GRANTED]),
+        "denied_need": int(counts[DENIED_NEED]),
+        "denied_available": int(counts[DENIED_AVAILABLE]),
+        "denied_unsafe": int(counts[DENIED_UNSAFE]),
+        "released": released,
+    }
@@ -0,0 +1,373 @@
+# lib/sequences.py
+import math
+import os
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Sequence
+
+from lib.core import _Timeout, safety_check, interchangeable_classes
+
+
+class SafeSequenceEnumerator:
+    """安全序列惰性枚举器
+
+    以显式栈做深度优先搜索，逐个产出安全序列，可限制数量与耗时。
+    Alloc 与 Need 完全相同的进程可以互换，collapse=True 时只展开
+    其中按编号递增的一种顺序，每个产出的序列代表 multiplicity 个等价序列。
+    prefix 给出已确定的前几个进程，只枚举以其开头的子树（用于并行拆分）。
+    """
+
+    def __init__(self, alloc, need, available,
+                 max_count: Optional[int] = None,
+                 time_budget: Optional[float] = None,
+                 collapse: bool = True,
+                 prefix: Sequence[int] = ()):
+        self.alloc = np.asarray(alloc)
+        self.need = np.asarray(need)
+        self.available = np.asarray(available)
+        self.max_count = max_count
+        self.time_budget = time_budget
+        self.collapse = collapse
+        self.prefix = [int(i) for i in prefix]
+
+        n = self.alloc.shape[0]
+        if collapse:
+            self.labels = interchangeable_classes(self.alloc, self.need)
+        else:
+            self.labels = np.arange(n)
+        # 每个产出序列对应的等价序列数
+        self.multiplicity = math.prod(
+            math.factorial(int(k)) for k in np.bincount(self.labels)) if n else 1
+
+        self.safe = None        # 初始状态是否安全
+        self.found = 0          # 已产出的序列数
+        self.nodes = 0          # 已扩展的搜索节点数
+        self.truncated = False  # 是否因数量或时间限制提前结束
+
+    def _candidates(self, work: np.ndarray, finish: np.ndarray) -> np.ndarray:
+        """当前可执行的进程，等价进程只保留编号最小的一个"""
+        idx = np.flatnonzero(~finish & np.all(self.need <= work, axis=1))
+        if self.collapse and idx.size > 1:
+            _, first = np.unique(self.labels[idx], return_index=True)
+            idx = idx[np.sort(first)]
+        return idx
+
+    def _after(self, prefix) -> Optional[tuple]:
+        """依次执行prefix中的进程后的(work, finish)，prefix不可执行时返回None"""
+        work = self.available.copy()
+        finish = np.zeros(self.alloc.shape[0], dtype=bool)
+        for i in prefix:
+            if finish[i] or np.any(self.need[i] > work):
+                return None
+            finish[i] = True
+            work += self.alloc[i]
+        return work, finish
+
+    def children(self, prefix) -> List[int]:
+        """prefix之后下一步可执行的进程（等价进程只保留一个），即搜索树中该节点的子节点"""
+        state = self._after(prefix)
+        if state is None:
+            return []
+        return self._candidates(*state).tolist()
+
+    def __iter__(self):
+        n = self.alloc.shape[0]
+        self.safe, _ = safety_check(self.alloc, self.need, self.available.copy())
+        if not self.safe:
+            return
+        if n == 0:
+            self.found = 1
+            yield []
+            return
+
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget
+
+        # 安全状态下任一可执行进程完成后仍然安全，因此搜索不会走入死路
+        state = self._after(self.prefix)
+        if state is None:
+            return
+        work, finish = state
+        seq = list(self.prefix)
+        if len(seq) == n:
+            self.found = 1
+            yield list(seq)
+            return
+        stack = [self._candidates(work, finish)]
+        pos = [0]
+
+        while stack:
+            cands, p = stack[-1], pos[-1]
+            if p >= len(cands):
+                # 回溯
+                stack.pop()
+                pos.pop()
+                if stack:
+                    i = seq.pop()
+                    finish[i] = False
+                    work -= self.alloc[i]
+                continue
+
+            i = cands[p]
+            pos[-1] += 1
+            finish[i] = True
+            work += self.alloc[i]
+            seq.append(int(i))
+            self.nodes += 1
+
+            if len(seq) == n:
+                # 已产出max_count个序列时，确实还有下一个序列才算截断
+                if self.max_count is not None and self.found >= self.max_count:
+                    self.truncated = True
+                    return
+                self.found += 1
+                yield list(seq)
+            if deadline is not None and time.perf_counter() > deadline:
+                self.truncated = True
+                return
+            stack.append(self._candidates(work, finish))
+            pos.append(0)
+
+
+# 工作进程每次转换为数组的序列数
+SUBTREE_BLOCK = 65536
+
+
+def _enumerate_subtree(alloc, need, available, prefix, collapse,
+                       max_count: Optional[int], deadline: Optional[float]) -> (np.ndarray, bool):
+    """工作进程：枚举以prefix开头的安全序列，返回((K, n)数组, 是否因限制提前结束)
+
+    deadline为time.time()的绝对时刻；结果分批转换为数组，避免整个子树以列表形式驻留内存。
+    """
+    n = alloc.shape[0]
+    dtype = np.int16 if n < 2 ** 15 else np.int32
+    budget = None if deadline is None else max(deadline - time.time(), 0.0)
+    enumerator = SafeSequenceEnumerator(alloc, need, available, max_count, budget, collapse, prefix)
+    blocks, rows = [], []
+    for seq in enumerator:
+        rows.append(seq)
+        if len(rows) >= SUBTREE_BLOCK:
+            blocks.append(np.array(rows, dtype=dtype))
+            rows = []
+    blocks.append(np.array(rows, dtype=dtype).reshape(len(rows), n))
+    return np.concatenate(blocks), enumerator.truncated
+
+
+class ParallelSequenceEnumerator:
+    """多进程完整枚举安全序列，逐块产出(K, n)数组
+
+    按序列的前split_depth个进程把搜索树拆成子树，交给ProcessPoolExecutor并行枚举；
+    子树按串行深度优先的顺序提交与取回，拼接后的结果与SafeSequenceEnumerator相同。
+    同时在途的子树不超过2·workers个，内存占用与子树大小而非序列总数成正比；
+    max_count与time_budget同时约束各子树与总量，超出时truncated为True。
+    mp_context为multiprocessing的上下文，多线程的宿主进程（如Streamlit）应使用spawn。
+    """
+
+    def __init__(self, alloc, need, available,
+                 workers: Optional[int] = None,
+                 split_depth: int = 2,
+                 collapse: bool = True,
+                 max_count: Optional[int] = None,
+                 time_budget: Optional[float] = None,
+                 mp_context=None):
+        self.alloc = np.asarray(alloc)
+        self.need = np.asarray(need)
+        self.available = np.asarray(available)
+        self.workers = workers or os.cpu_count() or 1
+        self.split_depth = split_depth
+        self.collapse = collapse
+        self.max_count = max_count
+        self.time_budget = time_budget
+        self.mp_context = mp_context
+
+        self.found = 0          # 已产出的序列数
+        self.truncated = False  # 是否因数量或时间限制提前结束
+
+    def _emit(self, block: np.ndarray) -> np.ndarray:
+        """计数并按max_count截断"""
+        if self.max_count is not None and self.found + len(block) >= self.max_count:
+            self.truncated = self.truncated or self.found + len(block) > self.max_count
+            block = block[:self.max_count - self.found]
+        self.found += len(block)
+        return block
+
+    def _full(self) -> bool:
+        return self.max_count is not None and self.found >= self.max_count
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        n = self.alloc.shape[0]
+        splitter = SafeSequenceEnumerator(self.alloc, self.need, self.available, collapse=self.collapse)
+        if n == 0 or not safety_check(self.alloc, self.need, self.available.copy())[0]:
+            sequences = list(splitter)
+            if sequences:
+                yield self._emit(np.array(sequences, dtype=np.int16).reshape(len(sequences), n))
+            return
+
+        # 逐层展开前split_depth层，得到各子树的前缀
+        prefixes = [[]]
+        for _ in range(min(self.split_depth, n - 1)):
+            prefixes = [p + [i] for p in prefixes for i in splitter.children(p)]
+
+        deadline = None if self.time_budget is None else time.time() + self.time_budget
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=self.mp_context) as pool:
+            queue = deque()
+            pending = iter(prefixes)
+            try:
+                while True:
+                    # 保持至多2·workers个子树在途
+                    while len(queue) < 2 * self.workers and not self._full():
+                        prefix = next(pending, None)
+                        if prefix is None:
+                            break
+                        remain = None if self.max_count is None else self.max_count - self.found
+                        queue.append(pool.submit(_enumerate_subtree, self.alloc, self.need, self.available,
+                                                 prefix, self.collapse, remain, deadline))
+                    if not queue:
+                        return
+                    block, truncated = queue.popleft().result()
+                    self.truncated = self.truncated or truncated
+                    block = self._emit(block)
+                    if len(block):
+                        yield block
+                    if self._full() or (deadline is not None and time.time() > deadline):
+                        if queue or next(pending, None) is not None:
+                            self.truncated = True
+                        return
+            finally:
+                for future in queue:
+                    future.cancel()
+
+
+def score_sequences(sequences, alloc, available, resources) -> np.ndarray:
+    """批量计算安全序列的加权资源利用率，sequences为(K, n)数组
+
+    权重为各资源占总量的比例，第t步的利用率 Σ_j (总量_j - work_j)/总量_j · 总量_j/Σ总量
+    化简为 (Σ总量 - Σwork)/Σ总量，只依赖各进程已分配资源之和，
+    因此按序列取行做累加即可得到全部K个序列每一步的利用率，取平均为评分。
+    """
+    alloc = np.asarray(alloc)
+    n = alloc.shape[0]
+    total = float(np.sum(resources))
+    if n == 0 or total == 0:
+        return np.zeros(len(sequences))
+    sequences = np.asarray(sequences, dtype=np.int64).reshape(-1, n)
+    released = alloc.sum(axis=1)
+    work = np.cumsum(released[sequences], axis=1) + float(np.sum(available))
+    return (total - work).mean(axis=1) / total
+
+
+def top_sequences(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """得分最高的k个序列的下标，按得分降序（得分相同时下标小者在前）"""
+    scores = np.asarray(scores)
+    if k is None or k >= scores.size:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    # argpartition在第k名并列时任取其一，先取出所有不低于第k名得分的下标再排序
+    threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    best = np.flatnonzero(scores >= threshold)
+    return best[np.lexsort((best, -scores[best]))][:k]
+
+
+def _sequence_cost(released: np.ndarray, seq) -> int:
+    """Σ_t 前t个进程释放资源之和，越小则资源利用率越高"""
+    n = len(seq)
+    return int((released[seq] * np.arange(n, 0, -1)).sum())
+
+
+def _greedy_sequence(alloc, need, work, released) -> List[int]:
+    """每步执行可执行进程中已分配资源之和最小的一个"""
+    n = alloc.shape[0]
+    finish = np.zeros(n, dtype=bool)
+    seq = []
+    for _ in range(n):
+        runnable = np.flatnonzero(~finish & np.all(need <= work, axis=1))
+        i = int(runnable[np.argmin(released[runnable])])
+        finish[i] = True
+        work = work + alloc[i]
+        seq.append(i)
+    return seq
+
+
+def _improve_sequence(alloc, need, available, released, seq, deadline) -> List[int]:
+    """相邻交换局部改进：把资源少的进程前移，交换后须仍然安全"""
+    seq = list(seq)
+    improved = True
+    while improved and (deadline is None or time.perf_counter() < deadline):
+        improved = False
+        work = np.array(available, copy=True)
+        for k in range(len(seq) - 1):
+            a, b = seq[k], seq[k + 1]
+            if (released[b] < released[a] and np.all(need[b] <= work)
+                    and np.all(need[a] <= work + alloc[b])):
+                seq[k], seq[k + 1] = b, a
+                improved = True
+            work = work + alloc[seq[k]]
+    return seq
+
+
+def best_safe_sequence(alloc, need, available, resources,
+                       exact_max_n: int = 15,
+                       time_budget: Optional[float] = 1.0) -> (List[int], float, bool):
+    """寻找资源利用率最高的安全序列，返回(序列, 评分, 是否为精确最优)
+
+    评分最大等价于最小化 Σ_k 第k个进程的已分配资源之和×(n-k)。
+    进程数不超过exact_max_n时对已完成集合做记忆化搜索求精确最优，
+    否则（或超出时间预算时）用贪心加相邻交换的局部改进。状态不安全时返回空序列。
+    """
+    alloc = np.asarray(alloc)
+    need = np.asarray(need)
+    available = np.asarray(available)
+    n = alloc.shape[0]
+    if not safety_check(alloc, need, available.copy())[0]:
+        return [], 0.0, True
+    if n == 0:
+        return [], 0.0, True
+
+    released = alloc.sum(axis=1)
+    deadline = None
+    if time_budget is not None:
+        deadline = time.perf_counter() + time_budget
+
+    seq, exact = None, False
+    if n <= exact_max_n:
+        memo = {}
+
+        def solve(mask: int, work: np.ndarray) -> (int, tuple):
+            """已完成集合为mask时，剩余部分的最小代价及对应顺序"""
+            if mask in memo:
+                return memo[mask]
+            if deadline is not None and time.perf_counter() > deadline:
+                raise _Timeout
+            done = bin(mask).count("1")
+            remain = np.array([i for i in range(n) if not mask >> i & 1])
+            runnable = remain[np.all(need[remain] <= work, axis=1)]
+            if runnable.size == remain.size:
+                # 剩余进程都可执行，按已分配资源从小到大排列最优
+                order = remain[np.argsort(released[remain], kind="stable")]
+                cost = int((released[order] * np.arange(n - done, 0, -1)).sum())
+                memo[mask] = (cost, tuple(order.tolist()))
+                return memo[mask]
+            best = None
+            for i in runnable.tolist():
+                sub_cost, sub_order = solve(mask | 1 << i, work + alloc[i])
+                cost = int(released[i]) * (n - done) + sub_cost
+                if best is None or cost < best[0]:
+                    best = (cost, (i,) + sub_order)
+            memo[mask] = best
+            return best
+
+        try:
+            seq, exact = list(solve(0, available.copy())[1]), True
+        except _Timeout:
+            pass
+
+    if seq is None:
+        seq = _greedy_sequence(alloc, need, available.copy(), released)
+        seq = _improve_sequence(alloc, need, available, released, seq, deadline)
+
+    score = float(score_sequences([seq], alloc, available, resources)[0])
+    return seq, score, exact
@@ -0,0 +1,236 @@
+# lib/server.py
+"""异步准入服务：python -m lib.server
+
+基于asyncio的本地TCP服务，协议为每行一个JSON对象：
+  {"id": 1, "pid": 3, "request": [1, 0, 2]}  ->  {"id": 1, "result": "granted", "granted": true,
+                                                   "released": false, "safe_sequence": [...]}
+  {"id": 2, "op": "state"}                    ->  当前的n、m、可用资源、需求矩阵与安全序列
+  {"id": 3, "op": "metrics"}                  ->  服务端计时与计数
+id原样返回，可省略；同一连接上的响应与请求顺序一致。
+recycle=True时进程完成并归还资源后重新声明其最大需求（即一个反复执行的作业），
+服务可以持续运行而不会在所有进程完成后只剩拒绝。
+
+各连接读到的请求先放入待处理队列，事件循环的本轮回调结束后一次性按到达顺序交给
+lib.core.admit判定（即微批），再按连接合并写回；判定只在事件循环线程中同步执行，
+状态的修改天然串行，无需加锁。
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from lib.core import GRANTED, _safe_order, admit
+from lib.metrics import Metrics
+
+# 判定结果的名称，按lib.core中的结果编号排列
+RESULTS = ("granted", "denied_need", "denied_available", "denied_unsafe")
+# 单个微批的最大请求数，超过时立即判定，限制排队延迟
+DEFAULT_MAX_BATCH = 4096
+READ_SIZE = 1 << 16
+INT32_MAX = np.iinfo(np.int32).max
+
+
+class AdmissionServer:
+    """包装一个系统状态的准入服务
+
+    state为包含alloc/need/available的字典（如lib.core.initstate的结果），原地修改；
+    recycle=True时还需要max_alloc。
+    """
+
+    def __init__(self, state: Dict, max_batch: int = DEFAULT_MAX_BATCH, with_sequence: bool = True,
+                 method: str = "auto", recycle: bool = False):
+        self.state = state
+        self.method = method
+        self.recycle = recycle
+        self.n, self.m = state["alloc"].shape
+        self.max_batch = max_batch
+        self.with_sequence = with_sequence
+        self.metrics = Metrics(prefix="banker_server")
+        self._pending = []  # (连接的writer, 类型, id, 进程号, 请求或错误说明)
+        self._scheduled = False
+        self._order = None  # 上一次编码的安全序列及其JSON文本
+        self._order_text = "null"
+        _safe_order(state, method)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """读取一个连接上的请求行"""
+        self.metrics.inc("connections")
+        rest = b""
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                lines = (rest + data).split(b"\n")
+                rest = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        self._pending.append(self._parse(writer, line))
+                if len(self._pending) >= self.max_batch:
+                    self.flush()
+                elif self._pending and not self._scheduled:
+                    # 同一轮事件循环中各连接读到的请求合并为一个微批
+                    self._scheduled = True
+                    asyncio.get_running_loop().call_soon(self.flush)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _parse(self, writer, line: bytes) -> tuple:
+        """解析并校验一行请求"""
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return writer, "error", None, None, "无法解析的JSON"
+        if not isinstance(message, dict):
+            return writer, "error", None, None, "请求应为JSON对象"
+        rid = message.get("id")
+        op = message.get("op", "admit")
+        if op != "admit":
+            if op in ("state", "metrics"):
+                return writer, op, rid, None, None
+            return writer, "error", rid, None, f"未知的操作: {op}"
+
+        pid = message.get("pid")
+        if type(pid) is not int or not 0 <= pid < self.n:
+            return writer, "error", rid, None, f"进程号应为0到{self.n - 1}的整数"
+        # m较小，逐项检查列表比先转换为数组再检查快
+        req = message.get("request")
+        if (type(req) is not list or len(req) != self.m
+                or not all(type(x) is int and x >= 0 for x in req)):
+            return writer, "error", rid, None, f"请求应为{self.m}个非负整数"
+        if req and max(req) > INT32_MAX:
+            # 超出int32的请求量必然超过需求，截断后按超过需求拒绝
+            req = [min(x, INT32_MAX) for x in req]
+        return writer, "admit", rid, pid, np.array(req, dtype=np.int32)
+
+    def flush(self):
+        """按到达顺序判定所有待处理请求，并按连接合并写回"""
+        self._scheduled = False
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        start = time.perf_counter()
+        out: Dict[asyncio.StreamWriter, List[str]] = {}
+        counts = [0] * len(RESULTS)
+        for writer, kind, rid, pid, req in batch:
+            if kind == "admit":
+                code, released = admit(self.state, pid, req, self.method)
+                counts[code] += 1
+                if released and self.recycle:
+                    self._redeclare(pid)
+                text = (f'{{"id": {json.dumps(rid)}, "result": "{RESULTS[code]}", '
+                        f'"granted": {"true" if code == GRANTED else "false"}, '
+                        f'"released": {"true" if released else "false"}')
+                if self.with_sequence:
+                    text += f', "safe_sequence": {self._sequence_text()}'
+                text += "}\n"
+            elif kind == "state":
+                text = json.dumps({"id": rid, **self.snapshot()}) + "\n"
+            elif kind == "metrics":
+                text = json.dumps({"id": rid, **self.metrics.snapshot()}) + "\n"
+            else:
+                self.metrics.inc("errors")
+                text = json.dumps({"id": rid, "error": req}, ensure_ascii=False) + "\n"
+            out.setdefault(writer, []).append(text)
+
+        for writer, texts in out.items():
+            if not writer.is_closing():
+                writer.write("".join(texts).encode())
+        for name, value in zip(RESULTS, counts):
+            if value:
+                self.metrics.inc(name, value)
+        self.metrics.inc("decisions", sum(counts))
+        self.metrics.inc("batches")
+        self.metrics.observe("batch", time.perf_counter() - start)
+
+    def _redeclare(self, pid: int):
+        """已完成的进程重新声明最大需求
+
+        该进程的已分配为0，移到安全序列末尾不影响其余进程的work；
+        末尾的work为系统总资源，不小于其最大需求，因此新序列仍然安全，无需重新检查。
+        """
+        self.state["need"][pid] = self.state["max_alloc"][pid]
+        order = self.state.get("safe_order")
+        if order is not None:
+            self.state["safe_order"] = np.append(order[order != pid], pid)
+        self.metrics.inc("recycled")
+
+    def _sequence_text(self) -> str:
+        """当前安全序列的JSON文本；序列未变化时复用上一次的编码"""
+        order = self.state.get("safe_order")
+        if order is not self._order:
+            self._order = order
+            self._order_text = "null" if order is None else json.dumps(order.tolist())
+        return self._order_text
+
+    def snapshot(self) -> Dict:
+        """当前状态的字典形式"""
+        order = self.state.get("safe_order")
+        return {
+            "n": self.n,
+            "m": self.m,
+            "available": self.state["available"].tolist(),
+            "need": self.state["need"].tolist(),
+            "max": self.state["max_alloc"].tolist() if "max_alloc" in self.state else None,
+            "recycle": self.recycle,
+            "safe": order is not None,
+            "safe_sequence": None if order is None else order.tolist(),
+        }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    from lib.__main__ import add_source_arguments
+
+    parser = argparse.ArgumentParser(prog="python -m lib.server", description="银行家算法异步准入服务")
+    add_source_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口，0为任意空闲端口")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="单个微批的最大请求数")
+    parser.add_argument("--no-sequence", action="store_true", help="响应中不附带安全序列")
+    parser.add_argument("--no-recycle", action="store_true", help="进程完成后不再重新声明最大需求")
+    # 缺省生成一个安全状态，资源不过分紧张，使相当比例的请求能够获批并经过安全检查
+    parser.set_defaults(generator="safe", n=200, m=4, lowest=10)
+    return parser.parse_args(argv)
+
+
+async def serve(server: AdmissionServer, host: str, port: int):
+    """启动服务并一直运行；启动后在标准输出打印一行监听地址的JSON"""
+    listener = await server.serve(host, port)
+    host, port = listener.sockets[0].getsockname()[:2]
+    print(json.dumps({"host": host, "port": port, "n": server.n, "m": server.m}), flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None) -> int:
+    from lib.__main__ import block_heavy_modules, build_state
+    from lib.ingest import ValidationError
+
+    args = parse_args(argv)
+    block_heavy_modules()
+    try:
+        state, _ = build_state(args)
+    except (ValidationError, OSError) as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
+        return 1
+    server = AdmissionServer(state, args.max_batch, not args.no_sequence, args.method,
+                             recycle=not args.no_recycle)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        print(server.metrics.to_prometheus(), end="", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+# lib/simulator.py
+import itertools
+import numpy as np
+from typing import Callable, Dict, Iterator, List, Optional
+
+from lib.core import (GRANTED, DENIED_NEED, DENIED_AVAILABLE, DENIED_UNSAFE,
+                      calneed, packreqs, refreshavailable, safety_check)
+
+
+class Simulator:
+    """脱离界面的银行家算法模拟器
+
+    持有系统资源、矩阵、请求序列与当前tick，逐tick处理请求：
+    当前状态安全时按请求分配（需求满足后释放该进程的资源），不安全时跳过该请求，
+    与界面上“计算下一个/跳过”的语义一致。所有数组原地修改，界面可直接引用。
+    """
+
+    def __init__(self, sys_resource, max_alloc, alloc, pids, reqs,
+                 chunks: Optional[Iterator] = None, method: str = "batched",
+                 restart: Optional[Callable[[], Iterator]] = None):
+        # 状态为连续的int32数组，请求序列为结构化数组，pids/reqs是其字段视图
+        self.sys_resource = np.asarray(sys_resource, dtype=np.int32)
+        self.max_alloc = np.asarray(max_alloc, dtype=np.int32)
+        self.alloc = np.array(alloc, dtype=np.int32)
+        self.need = calneed(self.max_alloc, self.alloc)
+        n, m = self.alloc.shape
+        self.available = refreshavailable(n, m, self.sys_resource, self.alloc).astype(np.int32)
+        self._buffer = packreqs(np.asarray(pids), np.asarray(reqs).reshape(-1, m))
+        self._size = len(self._buffer)
+        self._chunks = chunks  # 尚未生成的请求块，处理到序列末尾时再追加
+        self._restart = restart  # 重新生成与chunks相同的请求块，见lib.core.initstate
+        self._consumed = 0  # 已从chunks取出的块数
+        self.method = method   # 安全性检查方法，见lib.core.safety_check
+        self.tick = 0
+        self._check = None  # 当前状态的(是否安全, 安全序列)缓存，状态改变后失效
+
+    @classmethod
+    def from_state(cls, state: Dict, method: str = "batched") -> "Simulator":
+        """由lib.core.initstate生成的状态字典创建模拟器"""
+        return cls(state["sys_resource"], state["max_alloc"], state["alloc"],
+                   state["pids"], state["reqs"], state.get("chunks"), method, state.get("restart"))
+
+    @property
+    def trace(self) -> np.ndarray:
+        """已生成的请求序列"""
+        return self._buffer[:self._size]
+
+    @property
+    def pids(self) -> np.ndarray:
+        return self.trace["pid"]
+
+    @property
+    def reqs(self) -> np.ndarray:
+        return self.trace["request"]
+
+    @property
+    def pending(self) -> bool:
+        """是否还有未生成的请求块"""
+        return self._chunks is not None
+
+    def _extend(self) -> bool:
+        """追加下一块请求，容量按倍数增长；没有更多请求时返回False"""
+        chunk = next(self._chunks, None) if self._chunks is not None else None
+        if chunk is None:
+            self._chunks = None
+            return False
+        self._consumed += 1
+        block = packreqs(*chunk)
+        end = self._size + len(block)
+        if end > len(self._buffer):
+            buffer = np.empty(max(end, 2 * len(self._buffer)), dtype=self._buffer.dtype)
+            buffer[:self._size] = self.trace
+            self._buffer = buffer
+        self._buffer[self._size:end] = block
+        self._size = end
+        return True
+
+    @property
+    def n(self) -> int:
+        return self.alloc.shape[0]
+
+    @property
+    def m(self) -> int:
+        return self.alloc.shape[1]
+
+    def blocks(self, start: int = 0) -> Iterator[np.ndarray]:
+        """从第start个请求起逐块给出请求序列，需要时生成后续块"""
+        while True:
+            if start < self._size:
+                end = self._size
+                yield self._buffer[start:end]
+                start = end
+            elif not self._extend():
+                return
+
+    def snapshot_blocks(self, start: int = 0) -> Iterator[np.ndarray]:
+        """从第start个请求起的请求序列快照，可在其他线程中迭代
+
+        已生成的部分只追加不修改，直接取视图；尚未生成的块由restart重新生成并跳过已取出的块，
+        不触及模拟器自身的生成器与缓冲区，也不会把整个序列留在模拟器中。
+        """
+        head = self._buffer[start:self._size]
+        skip, restart = self._consumed, self._restart
+        if self.pending and restart is None:
+            raise ValueError("惰性请求序列无法重新生成")
+        pending, position = self.pending, self._size
+
+        def generate():
+            if len(head):
+                yield head
+            if pending:
+                # start可能落在尚未生成的部分，跳过其前的请求
+                offset = position
+                for pids, reqs in itertools.islice(restart(), skip, None):
+                    begin = max(start - offset, 0)
+                    offset += len(pids)
+                    if begin < len(pids):
+                        yield packreqs(pids[begin:], reqs[begin:])
+        return generate()
+
+    @property
+    def done(self) -> bool:
+        """请求序列是否已处理完毕"""
+        while self.tick >= self._size:
+            if not self._extend():
+                return True
+        return False
+
+    def current(self):
+        """当前tick的(进程号, 请求)，处理完毕时为None"""
+        if self.done:
+            return None
+        record = self._buffer[self.tick]
+        return int(record["pid"]), record["request"]
+
+    def safety(self) -> (bool, List):
+        """当前状态的安全性检查结果(是否安全, 安全序列)，缓存到状态改变为止"""
+        if self._check is None:
+            self._check = safety_check(self.alloc, self.need, self.available, self.method)
+        return self._check
+
+    def is_safe(self) -> bool:
+        """当前状态是否安全"""
+        return self.safety()[0]
+
+    def step(self) -> int:
+        """按当前请求分配并前进一个tick，返回判定结果"""
+        pid, req = self.current()
+        self.tick += 1
+
+        # 合法性检查
+        if (req > self.need[pid]).any():
+            return DENIED_NEED
+        if (req > self.available).any():
+            return DENIED_AVAILABLE
+
+        self.alloc[pid] += req
+        self.need[pid] -= req
+        self.available -= req
+
+        # 需求满足后释放资源
+        if not self.need[pid].any():
+            self.available += self.alloc[pid]
+            self.alloc[pid] = 0
+        self._check = None
+        return GRANTED
+
+    def skip(self) -> int:
+        """跳过当前请求"""
+        self.tick += 1
+        return DENIED_UNSAFE
+
+    def advance(self) -> int:
+        """处理一个tick：状态安全时分配，否则跳过"""
+        return self.step() if self.is_safe() else self.skip()
+
+    def run(self, ticks: Optional[int] = None, until_denial: bool = False) -> Dict:
+        """连续处理最多ticks个请求（None表示直到结束）
+
+        until_denial=True时在第一个未获分配的请求处停下。返回各判定结果的计数。
+        """
+        counts = np.zeros(4, dtype=np.int64)
+        processed = 0
+        while not self.done and (ticks is None or processed < ticks):
+            code = self.advance()
+            counts[code] += 1
+            processed += 1
+            if until_denial and code != GRANTED:
+                break
+        return {
+            "ticks": processed,
+            "granted": int(counts[GRANTED]),
+            "denied_need": int(counts[DENIED_NEED]),
+            "denied_available": int(counts[DENIED_AVAILABLE]),
+            "skipped": int(counts[DENIED_UNSAFE]),
+            "tick": self.tick,
+            "safe": self.is_safe(),
+        }
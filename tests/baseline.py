@@ -0,0 +1,49 @@
+# tests/baseline.py
+"""测试用的随机状态与基准实现：逐个找第一个可执行进程的安全检查、枚举全部排列的穷举搜索"""
+import itertools
+
+import numpy as np
+
+
+def random_state(seed: int, n: int = None, m: int = None) -> tuple:
+    """随机的(alloc, need, available)，一部分安全，一部分不安全；部分进程的行相同以产生可互换进程"""
+    rng = np.random.default_rng(seed)
+    n = n or int(rng.integers(1, 7))
+    m = m or int(rng.integers(1, 4))
+    alloc = rng.integers(0, 4, size=(n, m), dtype=np.int32)
+    need = rng.integers(0, 6, size=(n, m), dtype=np.int32)
+    copies = rng.integers(0, n, size=n // 2)
+    alloc[:len(copies)], need[:len(copies)] = alloc[copies], need[copies]
+    available = rng.integers(0, 5, size=m, dtype=np.int32)
+    return alloc, need, available
+
+
+def first_fit(alloc, need, available) -> bool:
+    """基准安全检查：每次执行编号最小的可执行进程"""
+    work = available.astype(np.int64)
+    finish = [False] * len(alloc)
+    for _ in range(len(alloc)):
+        for i in range(len(alloc)):
+            if not finish[i] and (need[i] <= work).all():
+                finish[i] = True
+                work = work + alloc[i]
+                break
+        else:
+            return False
+    return True
+
+
+def is_safe_order(alloc, need, available, order) -> bool:
+    """逐步验证order是否为安全序列"""
+    work = available.astype(np.int64)
+    for i in order:
+        if (need[i] > work).any():
+            return False
+        work = work + alloc[i]
+    return sorted(order) == list(range(len(alloc)))
+
+
+def all_safe_orders(alloc, need, available) -> list:
+    """穷举全部排列，返回所有安全序列（按字典序）"""
+    return [list(p) for p in itertools.permutations(range(len(alloc)))
+            if is_safe_order(alloc, need, available, p)]
@@ -0,0 +1,34 @@
+# tests/test_cache.py
+"""lib.cache的测试：python -m pytest -q"""
+import numpy as np
+
+from lib.cache import LRUCache, state_key
+
+
+def test_state_key():
+    a = np.arange(6, dtype=np.int32).reshape(2, 3)
+    assert state_key(a, limit=1) == state_key(a.copy(), limit=1)
+    # 内容、形状、类型与参数任一不同时键不同
+    changed = a.copy()
+    changed[1, 2] += 1
+    keys = {state_key(a, limit=1), state_key(changed, limit=1), state_key(a.reshape(3, 2), limit=1),
+            state_key(a.astype(np.int64), limit=1), state_key(a, limit=2), state_key(a)}
+    assert len(keys) == 6
+    # 非连续数组按内容计算
+    assert state_key(np.asfortranarray(a)) == state_key(a)
+    assert state_key(a, b=1, c=2) == state_key(a, c=2, b=1)
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a成为最近使用
+    cache.put("c", 3)           # 淘汰b
+    assert cache.get("b") is None and cache.get("b", 0) == 0
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2 and (cache.hits, cache.misses) == (3, 2)
+    cache.put("a", 4)
+    assert cache.get("a") == 4 and len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
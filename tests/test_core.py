@@ -0,0 +1,194 @@
+# tests/test_core.py
+"""lib.core的测试：python -m pytest -q
+
+在随机的小规模状态上，把各优化实现与tests.baseline中的基准实现对照。
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+from lib.core import (AUTO_ROUNDS, DENIED_AVAILABLE, DENIED_NEED, DENIED_UNSAFE, GRANTED, _safety_sorted, admit,
+                      check_order, count_safe_sequences, initreqs, iterreqs, process_requests, safety_check)
+from tests.baseline import all_safe_orders, first_fit, is_safe_order, random_state
+
+SEEDS = range(40)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("method", ["batched", "sorted", "auto"])
+def test_safety_check_matches_first_fit(seed, method):
+    alloc, need, available = random_state(seed)
+    before = available.copy()
+    safe, seq = safety_check(alloc, need, available, method)
+    assert safe == first_fit(alloc, need, available)
+    assert (available == before).all()
+    if safe:
+        assert is_safe_order(alloc, need, available, seq)
+    else:
+        assert seq == []
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_safety_sorted_negative_available(seed):
+    # 试分配后work可能为负，此时任何需求非负的进程都不可执行
+    alloc, need, available = random_state(seed)
+    available = available - 5
+    assert _safety_sorted(alloc, need, available)[0] == first_fit(alloc, need, available)
+
+
+@pytest.mark.parametrize("unsafe", [False, True])
+def test_auto_hands_off_to_sorted(unsafe):
+    # 进程依次成链，batched每轮只释放一个进程，auto在AUTO_ROUNDS轮后交给sorted
+    n = AUTO_ROUNDS * 3
+    rng = np.random.default_rng(0)
+    perm = rng.permutation(n)
+    alloc = np.ones((n, 2), dtype=np.int32)
+    need = np.zeros((n, 2), dtype=np.int32)
+    need[perm] = np.arange(n)[:, None]
+    if unsafe:
+        need[perm[-1], 1] += 1
+    available = np.zeros(2, dtype=np.int32)
+    batched = safety_check(alloc, need, available, "batched")
+    auto = safety_check(alloc, need, available, "auto")
+    assert auto[0] == batched[0] == (not unsafe)
+    assert auto[1] == batched[1]
+    if not unsafe:
+        assert auto[1] == perm.tolist()
+
+
+def test_safety_check_rejects_unknown_method():
+    alloc, need, available = random_state(0)
+    with pytest.raises(ValueError):
+        safety_check(alloc, need, available, "dfs")
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_count_safe_sequences_exact(seed):
+    alloc, need, available = random_state(seed)
+    count, exact = count_safe_sequences(alloc, need, available, time_budget=None)
+    assert exact
+    assert count == len(all_safe_orders(alloc, need, available))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_count_safe_sequences_estimate(seed):
+    alloc, need, available = random_state(seed, n=6, m=2)
+    expected = len(all_safe_orders(alloc, need, available))
+    count, exact = count_safe_sequences(alloc, need, available, exact_max_n=0, samples=4000, seed=seed)
+    assert not exact or expected == 0
+    assert count == pytest.approx(expected, rel=0.25)
+
+
+def test_count_safe_sequences_time_budget():
+    # 超出时间预算时改用估计，并给出非精确标记
+    n = 24
+    alloc = np.ones((n, 1), dtype=np.int32)
+    need = np.arange(n, dtype=np.int32).reshape(n, 1) % 3
+    available = np.full(1, 2, dtype=np.int32)
+    count, exact = count_safe_sequences(alloc, need, available, exact_max_n=n, time_budget=0.0, seed=0)
+    assert not exact and count > 0
+
+
+def admit_baseline(alloc, need, available, pid, req) -> (int, bool):
+    """基准准入：在副本上试分配并用first_fit检查，安全时写回"""
+    if (req > need[pid]).any():
+        return DENIED_NEED, False
+    if (req > available).any():
+        return DENIED_AVAILABLE, False
+    alloc2, need2 = alloc.copy(), need.copy()
+    alloc2[pid] += req
+    need2[pid] -= req
+    if not first_fit(alloc2, need2, available - req):
+        return DENIED_UNSAFE, False
+    alloc[pid], need[pid] = alloc2[pid], need2[pid]
+    available -= req
+    if not need[pid].any() and alloc[pid].any():
+        available += alloc[pid]
+        alloc[pid] = 0
+        return GRANTED, True
+    return GRANTED, False
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("method", ["batched", "sorted", "auto"])
+def test_process_requests_matches_baseline(seed, method):
+    alloc, need, available = random_state(seed)
+    pids, reqs = initreqs(len(alloc), alloc.shape[1], need, seed=seed, padding=3)
+    # 末尾补一个超过需求的请求
+    pids, reqs = np.append(pids, 0), np.vstack([reqs, need[:1] + 1])
+    state = {"alloc": alloc.copy(), "need": need.copy(), "available": available.copy()}
+    codes, released = process_requests(state, reqs, pids, method)
+    for k, (pid, req) in enumerate(zip(pids, reqs)):
+        assert (codes[k], released[k]) == admit_baseline(alloc, need, available, pid, req)
+    for key, value in (("alloc", alloc), ("need", need), ("available", available)):
+        assert (state[key] == value).all()
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_check_order(seed):
+    alloc, need, available = random_state(seed)
+    n = len(alloc)
+    rng = np.random.default_rng(seed)
+    for order in itertools.islice(itertools.permutations(range(n)), 50):
+        order = np.array(order)
+        assert check_order(alloc, need, available, order) == is_safe_order(alloc, need, available, order)
+    assert not check_order(alloc, need, available, np.arange(n + 1))
+
+    # 给出pid与req时只检查pid之前的前缀，结果应与试分配后完整验证一致
+    safe, seq = safety_check(alloc, need, available)
+    if not safe:
+        return
+    order = np.array(seq)
+    for pid in range(n):
+        req = (rng.random(alloc.shape[1]) * (np.minimum(need[pid], available) + 1)).astype(np.int32)
+        alloc2, need2 = alloc.copy(), need.copy()
+        alloc2[pid] += req
+        need2[pid] -= req
+        expected = is_safe_order(alloc2, need2, available - req, order)
+        assert check_order(alloc, need, available, order, pid, req) == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_admit_cached_order(seed):
+    # 复用缓存的安全序列与每次重新搜索的判定相同，缓存的序列始终是当前状态的安全序列
+    alloc, need, available = random_state(seed)
+    pids, reqs = initreqs(len(alloc), alloc.shape[1], need, seed=seed, padding=3)
+    cached = {"alloc": alloc.copy(), "need": need.copy(), "available": available.copy()}
+    fresh = {"alloc": alloc.copy(), "need": need.copy(), "available": available.copy()}
+    for pid, req in zip(pids, reqs):
+        fresh.pop("safe_order", None)
+        assert admit(cached, pid, req) == admit(fresh, pid, req)
+        order = cached.get("safe_order")
+        if order is not None:
+            assert is_safe_order(cached["alloc"], cached["need"], cached["available"], order.tolist())
+
+
+def request_totals(pids, reqs, n):
+    """各进程请求量之和"""
+    totals = np.zeros((n, reqs.shape[1]), dtype=np.int64)
+    np.add.at(totals, pids, reqs)
+    return totals
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_initreqs(seed):
+    need = np.random.default_rng(seed).integers(0, 9, size=(7, 3), dtype=np.int32)
+    pids, reqs = initreqs(7, 3, need, seed=seed, padding=4)
+    assert (request_totals(pids, reqs, 7) == need).all()
+    assert (reqs[:-4].any(axis=1)).all() and not reqs[-4:].any()
+    again = initreqs(7, 3, need, seed=seed, padding=4)
+    assert (again[0] == pids).all() and (again[1] == reqs).all()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 8, 1000])
+def test_iterreqs(chunk_size):
+    need = np.random.default_rng(chunk_size).integers(0, 9, size=(20, 3), dtype=np.int32)
+    chunks = list(iterreqs(need, chunk_size=chunk_size, seed=1, padding=2))
+    assert all(len(p) <= max(chunk_size, 2) and len(p) == len(r) for p, r in chunks)
+    pids = np.concatenate([p for p, _ in chunks])
+    reqs = np.concatenate([r for _, r in chunks])
+    assert (request_totals(pids, reqs, 20) == need).all()
+    assert not reqs[-2:].any()
+    again = list(iterreqs(need, chunk_size=chunk_size, seed=1, padding=2))
+    assert all((a[0] == b[0]).all() and (a[1] == b[1]).all() for a, b in zip(chunks, again))
@@ -0,0 +1,70 @@
+# tests/test_ingest.py
+"""lib.ingest的测试：python -m pytest -q"""
+import io
+import json
+
+import numpy as np
+import pytest
+
+from lib.core import initsafeconfig
+from lib.ingest import ValidationError, iter_requests, parse_vector, read_requests, read_state
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 100])
+def test_formats(chunk_size):
+    sys_resource, max_alloc, alloc = initsafeconfig(5, 2, 5, seed=5)
+    rows = np.hstack([max_alloc, alloc])
+    state_csv = "max_0,max_1,alloc_0,alloc_1\n" + "".join(",".join(map(str, r)) + "\n\n" for r in rows)
+    state_jsonl = "\n".join([json.dumps({"sys_resource": sys_resource.tolist()}), ""]
+                            + [json.dumps({"max": a.tolist(), "alloc": b.tolist()})
+                               for a, b in zip(max_alloc, alloc)]) + "\n"
+    for text, fmt in ((state_csv, "csv"), (state_jsonl, "jsonl")):
+        read = read_state(io.StringIO(text), sys_resource if fmt == "csv" else None, fmt, chunk_size)
+        for got, want in zip(read, (sys_resource, max_alloc, alloc)):
+            assert (got == want).all()
+
+    pids = np.array([0, 4, 2, 2], dtype=np.int32)
+    reqs = np.array([[1, 0], [0, 2], [3, 1], [0, 0]], dtype=np.int32)
+    req_csv = "pid,r0,r1\n" + "".join(f"{p},{r[0]},{r[1]}\n" for p, r in zip(pids, reqs))
+    req_jsonl = "\n" + "".join(json.dumps({"pid": int(p), "request": r.tolist()}) + "\n\n"
+                               for p, r in zip(pids, reqs))
+    for text, fmt in ((req_csv, "csv"), (req_jsonl, "jsonl")):
+        got_pids, got_reqs = read_requests(io.StringIO(text), 5, 2, fmt, chunk_size)
+        assert (got_pids == pids).all() and (got_reqs == reqs).all()
+        assert sum(len(p) for p, _ in iter_requests(io.StringIO(text), 5, 2, fmt, chunk_size)) == len(pids)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100])
+@pytest.mark.parametrize("text, fmt, sys_resource", [
+    ("1,1,0,0\n2,2,1,1,0,0\n", "csv", None),      # 各块列数不同
+    ("1,1,0,0\n2,2,1,1\n", "csv", [3, 3, 3]),     # 与系统资源的种数不同
+    ('{"sys_resource": [3]}\n[1, 2]\n', "jsonl", None),
+    ('{"sys_resource": [3]}\n5\n', "jsonl", None),
+    ('{"sys_resource": 3}\n{"max": [1], "alloc": [0]}\n', "jsonl", None),
+    ('{"max": [1], "alloc": [0]}\n', "jsonl", ["x"]),
+    ("\xff\n", "csv", [3]),
+])
+def test_state_rejects_malformed(text, fmt, sys_resource, chunk_size):
+    data = io.BytesIO(text.encode("latin-1") if "\xff" in text else text.encode())
+    with pytest.raises(ValidationError):
+        read_state(data, sys_resource, fmt, chunk_size)
+
+
+@pytest.mark.parametrize("text", ['[0, [1]]\n', '"x"\n', '{"pid": "a", "request": [1]}\n', '{"request": [1]}\n'])
+def test_requests_reject_malformed(text):
+    with pytest.raises(ValidationError):
+        read_requests(io.StringIO(text), 2, 1, "jsonl", chunk_size=1)
+
+
+def test_requests_report_all_violations():
+    text = "".join(f"{p},{r}\n" for p, r in [(0, 1), (5, 0), (1, -1), (9, 2)])
+    with pytest.raises(ValidationError) as info:
+        read_requests(io.StringIO(text), 2, 1, "csv", chunk_size=1)
+    assert len(info.value.violations) == 2
+    assert "共2处" in info.value.violations[0] and "共1处" in info.value.violations[1]
+
+
+def test_parse_vector():
+    assert parse_vector("5, 3,0") == [5, 3, 0]
+    with pytest.raises(ValidationError):
+        parse_vector("1,a")
@@ -0,0 +1,26 @@
+# tests/test_main.py
+"""python -m lib命令行的测试：python -m pytest -q"""
+import json
+
+from lib.__main__ import main
+
+
+def test_random_run(capsys):
+    assert main(["-n", "6", "-m", "2", "--seed", "1", "--count"]) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result["source"] == "random(config)" and (result["n"], result["m"]) == (6, 2)
+    assert result["requests"] == sum(result[k] for k in
+                                     ("granted", "denied_need", "denied_available", "denied_unsafe"))
+
+
+def test_state_file(tmp_path, capsys):
+    state = tmp_path / "state.csv"
+    state.write_text("2,1,1,0\n1,2,0,1\n")
+    assert main(["--state", str(state), "--sys", "3,3", "--seed", "0"]) == 0
+    assert json.loads(capsys.readouterr().out)["initial_safe"]
+
+    # 格式错误的--sys与不存在的文件都输出JSON错误，而不是异常
+    assert main(["--state", str(state), "--sys", "5,x"]) == 1
+    assert "error" in json.loads(capsys.readouterr().err)
+    assert main(["--state", str(tmp_path / "missing.csv"), "--sys", "3,3"]) == 1
+    assert "error" in json.loads(capsys.readouterr().err)
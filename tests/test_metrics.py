@@ -0,0 +1,44 @@
+# tests/test_metrics.py
+"""lib.metrics的测试：python -m pytest -q"""
+import re
+
+from lib.metrics import Metrics
+
+
+def test_timers_and_counters():
+    metrics = Metrics()
+    metrics.observe("check", 0.002)
+    metrics.observe("check", 0.004)
+    with metrics.timer("step"):
+        pass
+    metrics.inc("granted")
+    metrics.inc("granted", 2)
+    snapshot = metrics.snapshot()
+    check = snapshot["timers"]["check"]
+    assert check["count"] == 2 and abs(check["total_ms"] - 6) < 1e-9
+    assert abs(check["last_ms"] - 4) < 1e-9 and abs(check["max_ms"] - 4) < 1e-9 and abs(check["mean_ms"] - 3) < 1e-9
+    assert snapshot["timers"]["step"]["count"] == 1
+    assert snapshot["counters"] == {"granted": 3}
+    metrics.reset()
+    assert metrics.snapshot() == {"timers": {}, "counters": {}}
+
+
+def test_to_prometheus():
+    metrics = Metrics(prefix="banker_server")
+    metrics.observe("batch", 0.5)
+    metrics.observe("batch", 0.25)
+    metrics.inc("denied-unsafe", 4)
+    text = metrics.to_prometheus()
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert "# TYPE banker_server_stage_seconds summary" in lines
+    assert 'banker_server_stage_seconds_sum{stage="batch"} 0.75' in lines
+    assert 'banker_server_stage_seconds_count{stage="batch"} 2' in lines
+    assert 'banker_server_stage_seconds_max{stage="batch"} 0.5' in lines
+    # 计数器名中的非法字符替换为下划线
+    assert "# TYPE banker_server_denied_unsafe_total counter" in lines
+    assert "banker_server_denied_unsafe_total 4" in lines
+    # 每个样本行都符合文本格式：名称{标签} 值
+    sample = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-z]+="[^"]*"\})? \S+$')
+    assert all(sample.match(line) for line in lines if not line.startswith("#"))
+    assert Metrics().to_prometheus() == "\n"
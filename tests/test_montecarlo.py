@@ -0,0 +1,57 @@
+# tests/test_montecarlo.py
+"""lib.montecarlo的测试：python -m pytest -q"""
+import numpy as np
+import pytest
+
+from lib.core import initsafeconfig, process_requests, safety_check
+from lib.montecarlo import batch_admission, batch_reqs, batch_safety, batch_systems, run, summarize
+
+GENERATORS = ["safe", "config", "independent"]
+
+
+@pytest.mark.parametrize("generator", GENERATORS)
+def test_batch_safety_matches_safety_check(generator):
+    sys_resource, max_alloc, alloc = batch_systems(200, 5, 3, seed=0, generator=generator)
+    need = max_alloc - alloc
+    available = sys_resource - alloc.sum(axis=1)
+    safe, _ = batch_safety(alloc, need, available)
+    expected = [safety_check(alloc[b], need[b], available[b])[0] for b in range(200)]
+    assert safe.tolist() == expected
+    assert (alloc >= 0).all() and (alloc <= max_alloc).all()
+    if generator == "safe":
+        assert safe.all()
+
+
+@pytest.mark.parametrize("generator", GENERATORS)
+def test_batch_admission_matches_admit(generator):
+    batch, n, m = 64, 5, 3
+    sys_resource, max_alloc, alloc = batch_systems(batch, n, m, seed=1, generator=generator)
+    need = max_alloc - alloc
+    available = sys_resource - alloc.sum(axis=1)
+    pids, reqs, valid = batch_reqs(need, np.random.default_rng(2))
+
+    states = [{"alloc": alloc[b].copy(), "need": need[b].copy(), "available": available[b].copy()}
+              for b in range(batch)]
+    codes = batch_admission(alloc, need, available, pids, reqs, valid)
+    for b, state in enumerate(states):
+        expected, _ = process_requests(state, reqs[b, valid[b]], pids[b, valid[b]])
+        assert (codes[b, valid[b]] == expected).all()
+        assert (codes[b, ~valid[b]] == -1).all()
+        assert (state["alloc"] == alloc[b]).all() and (state["available"] == available[b]).all()
+
+
+def test_safe_generator_matches_initsafeconfig():
+    # 批量生成与initsafeconfig逐个生成的分布相同，比较各量的均值
+    batch, n, m = 4000, 6, 2
+    sys_resource, max_alloc, alloc = batch_systems(batch, n, m, seed=3)
+    single = [initsafeconfig(n, m, 5, seed=seed) for seed in range(batch)]
+    for k, values in enumerate((sys_resource, max_alloc, alloc)):
+        expected = np.mean([s[k].mean() for s in single])
+        assert values.mean() == pytest.approx(expected, rel=0.03)
+
+
+def test_default_run_is_not_degenerate():
+    summary = summarize(run(2000, 10, 3, seed=0, workers=1))
+    assert "warnings" not in summary
+    assert summary["denials"]["granted"] > 0.1 and summary["denials"]["denied_unsafe"] > 0.1
+    assert summarize(run(2000, 10, 3, seed=0, generator="config", workers=1))["warnings"]
@@ -0,0 +1,89 @@
+# tests/test_scenario.py
+"""lib.scenario的测试：python -m pytest -q"""
+import io
+
+import numpy as np
+import pytest
+
+from lib.core import GRANTED, initsafeconfig, initstate, process_requests
+from lib.ingest import ValidationError
+from lib.scenario import load_scenario, replay_scenario, save_scenario
+from lib.simulator import Simulator
+
+
+def lazy_state(seed: int = 4, chunk_size: int = 7) -> dict:
+    sys_resource, max_alloc, alloc = initsafeconfig(12, 3, 5, seed=3)
+    return initstate(sys_resource, max_alloc, alloc, seed=seed, chunk_size=chunk_size)
+
+
+def scenario_bytes(sys_resource, max_alloc, alloc, pids, reqs) -> bytes:
+    buffer = io.BytesIO()
+    save_scenario(buffer, sys_resource, max_alloc, alloc, [(np.asarray(pids), np.asarray(reqs))])
+    return buffer.getvalue()
+
+
+def test_round_trip(tmp_path):
+    state = lazy_state()
+    chunks = [(state["pids"], state["reqs"])] + list(state["restart"]())
+    path = str(tmp_path / "trace.bks")
+    count = save_scenario(path, state["sys_resource"], state["max_alloc"], state["alloc"], chunks)
+
+    loaded = load_scenario(path)
+    assert isinstance(loaded["reqs"], np.memmap)
+    assert count == len(loaded["pids"]) == sum(len(p) for p, _ in chunks)
+    for key in ("sys_resource", "max_alloc", "alloc", "need", "available"):
+        assert (loaded[key] == state[key]).all()
+    assert (loaded["pids"] == np.concatenate([p for p, _ in chunks])).all()
+    assert (loaded["reqs"] == np.concatenate([r for _, r in chunks])).all()
+
+    # 分块回放与一次性处理的结果相同
+    expected = {k: loaded[k].copy() for k in ("alloc", "need", "available")}
+    codes, _ = process_requests(expected, np.asarray(loaded["reqs"]), np.asarray(loaded["pids"]))
+    summary = replay_scenario(loaded, chunk_size=5)
+    assert summary["requests"] == count
+    assert summary["granted"] == int((codes == GRANTED).sum())
+    assert (loaded["alloc"] == expected["alloc"]).all()
+
+
+@pytest.mark.parametrize("case, message", [
+    ({"pids": [0, 7]}, "进程号越界"),
+    ({"pids": [-1, 0]}, "进程号越界"),
+    ({"reqs": [[1, 0], [0, -2]]}, "请求量为负"),
+    ({"alloc": [[3, 0], [0, 0]]}, "已分配超过最大需求"),
+    ({"max_alloc": [[2, -1], [1, 1]]}, "最大需求为负"),
+    ({"sys_resource": [1, 4]}, "最大需求超过系统资源"),
+])
+def test_load_rejects_invalid(case, message):
+    scenario = {"sys_resource": [4, 4], "max_alloc": [[2, 1], [1, 1]], "alloc": [[1, 0], [0, 1]],
+                "pids": [0, 1], "reqs": [[1, 0], [1, 0]], **case}
+    with pytest.raises(ValidationError, match=message):
+        load_scenario(scenario_bytes(**scenario))
+
+
+def test_load_rejects_corrupt():
+    data = scenario_bytes([4], [[1]], [[0]], [0], [[1]])
+    with pytest.raises(ValidationError):
+        load_scenario(data[:-1])
+    with pytest.raises(ValidationError):
+        load_scenario(b"NOTASCN1" + data[8:])
+
+
+def test_snapshot_blocks():
+    state = lazy_state(chunk_size=5)
+    sim = Simulator.from_state(state)
+    expected = [(state["pids"], state["reqs"])] + list(state["restart"]())
+    pids = np.concatenate([p for p, _ in expected])
+    reqs = np.concatenate([r for _, r in expected])
+
+    sim.run(ticks=7)
+    size = len(sim.trace)
+    # 快照不修改模拟器的缓冲区与生成器，并能从任意位置开始
+    for start in (0, 3, size, len(pids) - 1):
+        blocks = list(sim.snapshot_blocks(start))
+        assert len(sim.trace) == size and sim.pending
+        trace = np.concatenate(blocks)
+        assert (trace["pid"] == pids[start:]).all() and (trace["request"] == reqs[start:]).all()
+
+    # 模拟器自己取出的请求块与快照一致
+    sim.run()
+    assert (sim.pids == pids).all() and (sim.reqs == reqs).all()
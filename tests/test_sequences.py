@@ -0,0 +1,128 @@
+# tests/test_sequences.py
+"""lib.sequences的测试：python -m pytest -q"""
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from lib.sequences import ParallelSequenceEnumerator, SafeSequenceEnumerator, best_safe_sequence, score_sequences, top_sequences
+from tests.baseline import all_safe_orders, is_safe_order, random_state
+
+SEEDS = range(40)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_enumerator(seed):
+    alloc, need, available = random_state(seed)
+    expected = all_safe_orders(alloc, need, available)
+
+    full = SafeSequenceEnumerator(alloc, need, available, collapse=False)
+    assert sorted(map(list, full)) == expected
+    assert full.found == len(expected) and not full.truncated
+
+    # 折叠可互换进程后，每个产出的序列代表multiplicity个不同的安全序列
+    collapsed = SafeSequenceEnumerator(alloc, need, available)
+    sequences = list(collapsed)
+    assert len(sequences) * collapsed.multiplicity == len(expected)
+    assert all(seq in expected for seq in sequences)
+    assert not collapsed.truncated
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_enumerator_max_count(seed):
+    alloc, need, available = random_state(seed)
+    total = len(list(SafeSequenceEnumerator(alloc, need, available, collapse=False)))
+    for limit in {1, total - 1, total, total + 1} - {0, -1}:
+        enumerator = SafeSequenceEnumerator(alloc, need, available, max_count=limit, collapse=False)
+        assert len(list(enumerator)) == min(limit, total)
+        # 恰好取完全部序列时不算截断
+        assert enumerator.truncated == (total > limit)
+
+
+def efficiency_baseline(alloc, available, resources, sequence) -> float:
+    """原calculate_efficiency的逐步计算：各资源利用率按总量加权，取各步平均"""
+    total = sum(resources)
+    work = list(available)
+    usage = 0.0
+    for client in sequence:
+        for j in range(len(work)):
+            work[j] += alloc[client][j]
+        for j in range(len(work)):
+            usage += (resources[j] - work[j]) / resources[j] * (resources[j] / total)
+    return usage / len(sequence)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_score_sequences(seed):
+    alloc, need, available = random_state(seed)
+    resources = available + alloc.sum(axis=0) + 1
+    sequences = all_safe_orders(alloc, need, available) or [list(range(len(alloc)))]
+    scores = score_sequences(sequences, alloc, available, resources)
+    expected = [efficiency_baseline(alloc, available, resources, seq) for seq in sequences]
+    assert scores == pytest.approx(expected)
+
+
+def test_top_sequences():
+    scores = np.array([0.5, 0.9, 0.5, 0.1, 0.9])
+    assert top_sequences(scores).tolist() == [1, 4, 0, 2, 3]
+    assert top_sequences(scores, 3).tolist() == [1, 4, 0]
+    assert top_sequences(scores, 0).tolist() == []
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_best_safe_sequence(seed):
+    alloc, need, available = random_state(seed)
+    resources = available + alloc.sum(axis=0)
+    expected = all_safe_orders(alloc, need, available)
+    seq, score, exact = best_safe_sequence(alloc, need, available, resources, time_budget=None)
+    assert exact
+    if not expected:
+        assert seq == []
+        return
+    assert is_safe_order(alloc, need, available, seq)
+    assert score == pytest.approx(score_sequences(expected, alloc, available, resources).max())
+
+    # 启发式（贪心加局部改进）的结果仍须安全，且不优于精确最优
+    seq, heuristic, exact = best_safe_sequence(alloc, need, available, resources, exact_max_n=0)
+    assert not exact or len(alloc) == 0
+    assert is_safe_order(alloc, need, available, seq)
+    assert heuristic <= score + 1e-12
+
+
+def parallel_state():
+    """安全序列较多、可互换进程较少的状态"""
+    alloc = np.array([[1, 0], [0, 1], [1, 1], [2, 0], [0, 2], [1, 0], [0, 0]], dtype=np.int32)
+    need = np.array([[1, 1], [0, 1], [2, 2], [1, 0], [3, 1], [0, 0], [4, 4]], dtype=np.int32)
+    return alloc, need, np.array([1, 1], dtype=np.int32)
+
+
+@pytest.mark.parametrize("workers, split_depth", [(1, 1), (2, 2), (3, 3)])
+@pytest.mark.parametrize("collapse", [True, False])
+def test_parallel_matches_serial(workers, split_depth, collapse):
+    alloc, need, available = parallel_state()
+    serial = list(SafeSequenceEnumerator(alloc, need, available, collapse=collapse))
+    enumerator = ParallelSequenceEnumerator(alloc, need, available, workers=workers,
+                                            split_depth=split_depth, collapse=collapse)
+    blocks = list(enumerator)
+    # 各子树按串行深度优先的顺序拼接
+    assert np.concatenate(blocks).tolist() == serial
+    assert enumerator.found == len(serial) > 1 and not enumerator.truncated
+
+
+def test_parallel_max_count():
+    alloc, need, available = parallel_state()
+    serial = list(SafeSequenceEnumerator(alloc, need, available, collapse=False))
+    for limit in (1, 5, len(serial) - 1, len(serial), len(serial) + 3):
+        enumerator = ParallelSequenceEnumerator(alloc, need, available, workers=2, collapse=False,
+                                                max_count=limit)
+        result = np.concatenate(list(enumerator) or [np.zeros((0, 7))]).tolist()
+        assert result == serial[:limit] and enumerator.found == len(result)
+        assert enumerator.truncated == (len(serial) > limit)
+
+
+def test_parallel_spawn_and_unsafe():
+    alloc, need, available = parallel_state()
+    context = multiprocessing.get_context("spawn")
+    enumerator = ParallelSequenceEnumerator(alloc, need, available, workers=2, mp_context=context)
+    assert np.concatenate(list(enumerator)).tolist() == list(SafeSequenceEnumerator(alloc, need, available))
+    assert list(ParallelSequenceEnumerator(alloc, need, available - 1, workers=2)) == []
@@ -0,0 +1,162 @@
+# tests/test_server.py
+"""lib.server的测试：python -m pytest -q
+
+在本进程的事件循环中以任意空闲端口启动服务，通过TCP连接按协议收发。
+"""
+import asyncio
+import json
+
+import pytest
+
+from benchmarks import loadgen
+from lib.core import initsafeconfig, initstate, process_requests, safety_check
+from lib.server import RESULTS, AdmissionServer
+from tests.baseline import first_fit, is_safe_order
+
+
+def new_state(n: int = 12, m: int = 3, seed: int = 0) -> dict:
+    sys_resource, max_alloc, alloc = initsafeconfig(n, m, 5, seed=seed)
+    return initstate(sys_resource, max_alloc, alloc, seed=seed, padding=2)
+
+
+async def exchange(server: AdmissionServer, lines: list) -> list:
+    """在一个连接上一次性发送各行，按顺序读回同样多行响应"""
+    listener = await server.serve("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1 << 24)
+    writer.write(b"".join(line + b"\n" for line in lines))
+    replies = [json.loads(await reader.readline()) for _ in lines]
+    writer.close()
+    listener.close()
+    await listener.wait_closed()
+    return replies
+
+
+def talk(server: AdmissionServer, messages: list) -> list:
+    return asyncio.run(exchange(server, [json.dumps(m).encode() for m in messages]))
+
+
+@pytest.mark.parametrize("max_batch", [1, 7, 4096])
+def test_admit_matches_process_requests(max_batch):
+    state = new_state()
+    expected_state = {k: state[k].copy() for k in ("alloc", "need", "available")}
+    codes, released = process_requests(expected_state, state["reqs"], state["pids"])
+
+    server = AdmissionServer(state, max_batch=max_batch)
+    messages = [{"id": k, "pid": int(pid), "request": req.tolist()}
+                for k, (pid, req) in enumerate(zip(state["pids"], state["reqs"]))]
+    replies = talk(server, messages)
+    assert [r["id"] for r in replies] == list(range(len(messages)))
+    assert [r["result"] for r in replies] == [RESULTS[c] for c in codes]
+    assert [r["granted"] for r in replies] == [c == 0 for c in codes]
+    assert [r["released"] for r in replies] == released.tolist()
+    for key, value in expected_state.items():
+        assert (state[key] == value).all()
+    # 最后一个响应附带的安全序列是最终状态的安全序列
+    assert is_safe_order(state["alloc"], state["need"], state["available"], replies[-1]["safe_sequence"])
+
+
+def test_no_sequence():
+    state = new_state()
+    reply, = talk(AdmissionServer(state, with_sequence=False), [{"pid": 0, "request": [0, 0, 0]}])
+    assert reply == {"id": None, "result": "granted", "granted": True, "released": False}
+
+
+def test_state_and_metrics():
+    state = new_state()
+    server = AdmissionServer(state)
+    pid, req = int(state["pids"][0]), state["reqs"][0].tolist()
+    replies = talk(server, [{"id": "a", "pid": pid, "request": req}, {"id": "b", "op": "state"},
+                            {"id": "c", "op": "metrics"}])
+    snapshot = replies[1]
+    assert snapshot["id"] == "b"
+    assert (snapshot["n"], snapshot["m"], snapshot["recycle"]) == (12, 3, False)
+    assert snapshot["available"] == state["available"].tolist()
+    assert snapshot["need"] == state["need"].tolist()
+    assert snapshot["max"] == state["max_alloc"].tolist()
+    assert snapshot["safe"] and snapshot["safe_sequence"] == replies[0]["safe_sequence"]
+    # 同一微批中metrics在计数之前编码，计数在下一次查询中可见
+    assert replies[2]["id"] == "c"
+    assert server.metrics.snapshot()["counters"]["decisions"] == 1
+
+
+@pytest.mark.parametrize("line, message", [
+    (b"{not json", "无法解析的JSON"),
+    (b"[1, 2]", "请求应为JSON对象"),
+    (b'{"id": 5, "op": "drop"}', "未知的操作: drop"),
+    (b'{"id": 5, "pid": 12, "request": [0, 0, 0]}', "进程号应为0到11的整数"),
+    (b'{"id": 5, "pid": -1, "request": [0, 0, 0]}', "进程号应为0到11的整数"),
+    (b'{"id": 5, "pid": "1", "request": [0, 0, 0]}', "进程号应为0到11的整数"),
+    (b'{"id": 5, "pid": 1.0, "request": [0, 0, 0]}', "进程号应为0到11的整数"),
+    (b'{"id": 5, "pid": 1}', "请求应为3个非负整数"),
+    (b'{"id": 5, "pid": 1, "request": [0, 0]}', "请求应为3个非负整数"),
+    (b'{"id": 5, "pid": 1, "request": [0, -1, 0]}', "请求应为3个非负整数"),
+    (b'{"id": 5, "pid": 1, "request": [0, 1.5, 0]}', "请求应为3个非负整数"),
+    (b'{"id": 5, "pid": 1, "request": [0, true, 0]}', "请求应为3个非负整数"),
+    (b'{"id": 5, "pid": 1, "request": {"0": 1}}', "请求应为3个非负整数"),
+])
+def test_error_replies(line, message):
+    state = new_state()
+    before = {k: state[k].copy() for k in ("alloc", "need", "available")}
+    server = AdmissionServer(state)
+    # 错误不影响同一连接上前后的请求
+    replies = asyncio.run(exchange(server, [b'{"id": 1, "op": "state"}', line, b'{"id": 2, "op": "state"}']))
+    assert replies[1] == {"id": 5 if b'"id": 5' in line else None, "error": message}
+    assert replies[0]["id"] == 1 and replies[2]["id"] == 2
+    assert server.metrics.snapshot()["counters"]["errors"] == 1
+    for key, value in before.items():
+        assert (state[key] == value).all()
+
+
+def test_oversized_request_is_denied_need():
+    state = new_state()
+    reply, = talk(AdmissionServer(state), [{"pid": 0, "request": [2 ** 40, 0, 0]}])
+    assert reply["result"] == "denied_need"
+
+
+def test_recycle_keeps_state_safe():
+    # 每轮每个进程请求其全部剩余需求，获批即完成并重新声明最大需求
+    state = new_state(n=20, seed=3)
+    total = state["sys_resource"].copy()
+    server = AdmissionServer(state, recycle=True)
+    recycled = 0
+    for _ in range(4):
+        snapshot, = talk(server, [{"op": "state"}])
+        replies = talk(server, [{"pid": pid, "request": need} for pid, need in enumerate(snapshot["need"])])
+        recycled += sum(r["released"] for r in replies)
+        assert (state["alloc"].sum(axis=0) + state["available"] == total).all()
+        assert first_fit(state["alloc"], state["need"], state["available"])
+        assert is_safe_order(state["alloc"], state["need"], state["available"], state["safe_order"])
+    assert recycled > 0
+    assert server.metrics.snapshot()["counters"]["recycled"] == recycled
+    assert (state["need"] + state["alloc"] == state["max_alloc"]).all()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_initsafeconfig_is_safe(seed):
+    sys_resource, max_alloc, alloc = initsafeconfig(30, 4, 10, maxnum=20, seed=seed)
+    need = max_alloc - alloc
+    available = sys_resource - alloc.sum(axis=0)
+    assert (need >= 0).all() and (need <= 20).all()
+    assert safety_check(alloc, need, available)[0]
+
+
+def test_loadgen_gets_grants():
+    # 闭环负载对默认规模的服务能得到获批、资源不足与不安全三类判定；
+    # 初始可用资源很少，进程完成并重新声明后获批比例才逐渐上升，请求数不宜过少
+    async def scenario():
+        sys_resource, max_alloc, alloc = initsafeconfig(200, 4, 10, seed=0)
+        server = AdmissionServer(initstate(sys_resource, max_alloc, alloc, seed=0), recycle=True)
+        listener = await server.serve("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        report = await loadgen.run("127.0.0.1", port, connections=4, total=50000, window=64, seed=0)
+        listener.close()
+        await listener.wait_closed()
+        return report
+
+    report = asyncio.run(scenario())
+    assert report["decisions"] == 50000 and report["recycle"]
+    results = report["results"]
+    assert sum(results.values()) == 50000 and "error" not in results
+    assert results["granted"] > 0.03 * 50000
+    assert results["denied_available"] > 0 and results.get("denied_unsafe", 0) > 0
@@ -0,0 +1,96 @@
+# tests/test_simulator.py
+"""lib.simulator的测试：python -m pytest -q"""
+import numpy as np
+import pytest
+
+from lib.core import DENIED_AVAILABLE, DENIED_NEED, DENIED_UNSAFE, GRANTED, initconfig, initstate
+from lib.simulator import Simulator
+from tests.baseline import first_fit
+
+SEEDS = range(20)
+
+
+def random_simulator(seed: int, **kwargs) -> (Simulator, dict):
+    sys_resource, max_alloc, alloc = initconfig(6, 3, 5, seed=seed)
+    state = initstate(sys_resource, max_alloc, alloc, seed=seed, padding=2, **kwargs)
+    return Simulator.from_state(state), state
+
+
+def simulate_baseline(state: dict) -> list:
+    """基准模拟：当前状态安全时按请求分配，否则跳过"""
+    alloc = state["alloc"].astype(np.int64)
+    need = state["need"].astype(np.int64)
+    available = state["available"].astype(np.int64)
+    codes = []
+    for pid, req in zip(state["pids"], state["reqs"]):
+        if not first_fit(alloc, need, available):
+            codes.append(DENIED_UNSAFE)
+        elif (req > need[pid]).any():
+            codes.append(DENIED_NEED)
+        elif (req > available).any():
+            codes.append(DENIED_AVAILABLE)
+        else:
+            alloc[pid] += req
+            need[pid] -= req
+            available -= req
+            if not need[pid].any():
+                available += alloc[pid]
+                alloc[pid] = 0
+            codes.append(GRANTED)
+    return codes
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_advance_matches_baseline(seed):
+    sim, state = random_simulator(seed)
+    expected = simulate_baseline(state)
+    codes = []
+    while not sim.done:
+        codes.append(sim.advance())
+    assert codes == expected
+    assert sim.tick == len(expected) and sim.current() is None
+    assert (sim.alloc.sum(axis=0) + sim.available == sim.sys_resource).all()
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_run_counts(seed):
+    sim, state = random_simulator(seed)
+    expected = simulate_baseline(state)
+    result = sim.run()
+    assert result["ticks"] == result["tick"] == len(expected)
+    assert result["granted"] == expected.count(GRANTED)
+    assert result["denied_need"] == expected.count(DENIED_NEED)
+    assert result["denied_available"] == expected.count(DENIED_AVAILABLE)
+    assert result["skipped"] == expected.count(DENIED_UNSAFE)
+    assert result["safe"] == sim.is_safe()
+
+
+def test_step_and_skip():
+    sim = Simulator([4, 4], [[2, 2], [3, 1]], [[1, 0], [0, 0]], [0, 1, 0, 1], [[1, 2], [3, 1], [1, 2], [5, 0]])
+    assert sim.current()[0] == 0 and (sim.current()[1] == [1, 2]).all()
+    assert sim.step() == GRANTED
+    # 进程0的需求已满足，资源全部归还
+    assert (sim.alloc[0] == 0).all() and (sim.available == [4, 4]).all()
+    assert sim.skip() == DENIED_UNSAFE and sim.tick == 2
+    assert sim.step() == DENIED_NEED
+    assert sim.step() == DENIED_NEED and sim.done
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_run_ticks_and_until_denial(seed):
+    sim, state = random_simulator(seed)
+    expected = simulate_baseline(state)
+
+    # 分段快进与一次性运行的结果相同
+    first = sim.run(ticks=3)
+    assert first["ticks"] == min(3, len(expected)) == sim.tick
+    stop = next((k for k in range(sim.tick, len(expected)) if expected[k] != GRANTED), None)
+    result = sim.run(until_denial=True)
+    if stop is None:
+        assert sim.done and result["ticks"] == len(expected) - first["ticks"]
+    else:
+        assert sim.tick == stop + 1 and result["granted"] == stop - first["ticks"]
+    sim.run()
+    assert sim.tick == len(expected)
+    assert sim.run() == {"ticks": 0, "granted": 0, "denied_need": 0, "denied_available": 0,
+                         "skipped": 0, "tick": len(expected), "safe": sim.is_safe()}